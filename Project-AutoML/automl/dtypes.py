@@ -0,0 +1,189 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import json
+from logging import getLogger
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import (
+    is_bool_dtype,
+    is_float_dtype,
+    is_integer_dtype,
+    is_object_dtype,
+    is_string_dtype,
+    union_categoricals,
+)
+
+logger = getLogger(__name__)
+
+DTYPE_MODES = ("default", "compact")
+
+# rows parsed to infer column types before the chunked read
+INFER_SAMPLE_ROWS = 100000
+CHUNK_ROWS = 500000
+# string columns with less distinct values than this ratio of rows become category
+CATEGORY_RATIO = 0.5
+
+MB = 1024 * 1024
+
+
+def load_schema(schema_file):
+    """
+    load json file of {column: dtype}
+    """
+    schema_file = schema_file or ""
+    if not schema_file.strip():
+        return {}
+    with open(schema_file, "r") as r_f:
+        schema = json.load(r_f)
+    return schema
+
+
+def is_text_dtype(dtype):
+    if dtype.name == "category":
+        return False
+    return is_object_dtype(dtype) or is_string_dtype(dtype)
+
+
+def infer_categorical_columns(sample, schema=None):
+    schema = schema or {}
+    columns = []
+    for column, series in sample.items():
+        if column in schema or not is_text_dtype(series.dtype):
+            continue
+        if series.nunique() <= max(len(series) * CATEGORY_RATIO, 1):
+            columns.append(column)
+    return columns
+
+
+def compact_frame(data, schema=None, categorical_columns=()):
+    """
+    downcast numeric columns to the smallest safe width and
+    convert low-cardinality string columns to category
+    """
+    schema = schema or {}
+    for column in data.columns:
+        series = data[column]
+        if column in schema:
+            if series.dtype != schema[column]:
+                data[column] = series.astype(schema[column])
+        elif column in categorical_columns:
+            if series.dtype.name != "category":
+                data[column] = series.astype("category")
+        elif is_bool_dtype(series.dtype):
+            continue
+        elif is_integer_dtype(series.dtype):
+            data[column] = pd.to_numeric(series, downcast="integer")
+        elif is_float_dtype(series.dtype):
+            data[column] = pd.to_numeric(series, downcast="float")
+    return data
+
+
+def concat_chunks(chunks):
+    """
+    concat compact chunks, categories of each chunk are unified
+    so category columns are kept as category
+    """
+    if len(chunks) == 1:
+        return chunks[0]
+
+    for column in chunks[0].columns:
+        if chunks[0][column].dtype.name != "category":
+            continue
+        categories = union_categoricals(
+            [chunk[column] for chunk in chunks], ignore_order=True
+        ).categories
+        for chunk in chunks:
+            chunk[column] = chunk[column].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_compact_csv(data_path, usecols=None, schema=None, categorical_columns=None):
+    """
+    infer types on a sample, then read the csv chunk by chunk in compact types
+    """
+    schema = schema or {}
+    sample = pd.read_csv(data_path, usecols=usecols, nrows=INFER_SAMPLE_ROWS)
+    if categorical_columns is None:
+        categorical_columns = infer_categorical_columns(sample, schema)
+
+    dtype = {column: "category" for column in categorical_columns}
+    dtype.update(schema)
+
+    chunks = []
+    reader = pd.read_csv(
+        data_path, usecols=usecols, dtype=dtype, chunksize=CHUNK_ROWS
+    )
+    for chunk in reader:
+        chunks.append(compact_frame(chunk, schema, categorical_columns))
+
+    if not chunks:
+        return compact_frame(sample, schema, categorical_columns)
+
+    # a column may be int in one chunk and float in another
+    data = compact_frame(concat_chunks(chunks), schema, categorical_columns)
+
+    # estimate the memory used by pandas default types from the sample
+    default_size = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+    report_memory_saved(default_size * len(data), data)
+    return data
+
+
+def read_compact_batches(batches, schema=None):
+    """
+    convert record batches to compact frames one by one
+    """
+    schema = schema or {}
+    chunks = []
+    categorical_columns = None
+    default_size = 0
+    for batch in batches:
+        chunk = batch.to_pandas()
+        if categorical_columns is None:
+            categorical_columns = infer_categorical_columns(chunk, schema)
+        default_size += chunk.memory_usage(deep=True).sum()
+        chunks.append(compact_frame(chunk, schema, categorical_columns))
+
+    if not chunks:
+        return None
+
+    data = compact_frame(concat_chunks(chunks), schema, categorical_columns)
+    report_memory_saved(default_size, data)
+    return data
+
+
+def report_memory_saved(default_size, data):
+    compact_size = data.memory_usage(deep=True).sum()
+    saved_size = default_size - compact_size
+    logger.info(
+        f"compact dtypes use {compact_size / MB:.1f} MB, pandas default "
+        f"{default_size / MB:.1f} MB, saved {saved_size / MB:.1f} MB"
+    )
+    return saved_size
+
+
+def encoded_dtype(x):
+    """
+    float32 for compact frames so that encoders keep the output compact
+    """
+    wide_dtypes = (np.dtype(np.int64), np.dtype(np.float64))
+    if any(dtype in wide_dtypes for dtype in x.dtypes):
+        return np.float64
+    if all(is_text_dtype(dtype) for dtype in x.dtypes):
+        return np.float64
+    return np.float32
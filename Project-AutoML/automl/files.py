@@ -0,0 +1,81 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import glob
+import os
+
+DATA_SUFFIXES = {
+    "csv": (".csv",),
+    "parquet": (".parquet", ".pq"),
+    "feather": (".feather", ".arrow", ".ipc"),
+}
+COLUMNAR_FORMATS = ("parquet", "feather")
+
+
+def is_glob(data_path):
+    return glob.has_magic(data_path)
+
+
+def is_hidden(name):
+    return name.startswith((".", "_"))
+
+
+def get_file_format(path):
+    for data_format, suffixes in DATA_SUFFIXES.items():
+        if path.endswith(suffixes):
+            return data_format
+    return None
+
+
+def list_shards(data_path):
+    """
+    data files of a file, a glob pattern or a (partitioned) directory,
+    hidden files and files like _SUCCESS are skipped
+    """
+    if is_glob(data_path):
+        paths = glob.glob(data_path, recursive=True)
+    elif os.path.isdir(data_path):
+        paths = []
+        for root, dir_names, names in os.walk(data_path):
+            dir_names[:] = [name for name in dir_names if not is_hidden(name)]
+            paths.extend(
+                os.path.join(root, name) for name in names if not is_hidden(name)
+            )
+    elif os.path.exists(data_path):
+        paths = [data_path]
+    else:
+        paths = []
+    return sorted(path for path in paths if get_file_format(path))
+
+
+def get_data_format(data_path):
+    """
+    csv, parquet or feather for a data file, a glob pattern or a directory
+    """
+    data_formats = {get_file_format(path) for path in list_shards(data_path)}
+    if len(data_formats) > 1:
+        raise Exception(f"{data_path} mixes data formats: {sorted(data_formats)}")
+    return data_formats.pop() if data_formats else None
+
+
+def get_dataset_source(data_path):
+    """
+    source for pyarrow.dataset, directories keep their hive partitioning
+    """
+    if is_glob(data_path):
+        return list_shards(data_path)
+    return data_path
@@ -22,8 +22,11 @@ from autosklearn.classification import AutoSklearnClassifier
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OrdinalEncoder
 
+from automl.dtypes import encoded_dtype
+from automl.encoders import get_cardinality_steps
 from automl.metrics import eval_classification_metrics
 from automl.mod.tool import BasePredictor, Tool
+from automl.profiling import stage
 from automl.params import Params
 
 
@@ -51,16 +54,20 @@ class AutoSklearn(Tool):
     }
 
     @staticmethod
-    def train_automl(train_x, train_y, other_params=None, **kwargs):
+    def train_automl(
+        train_x, train_y, other_params=None, encoder_options=None, **kwargs
+    ):
         params = Params(param_str=other_params, **kwargs)
         print(params)
-        pipeline_mods = []
+        pipeline_mods = get_cardinality_steps(encoder_options)
 
         pipeline_mods.append(
             (
                 "oridinal_encoder",
                 OrdinalEncoder(
-                    unknown_value=np.nan, handle_unknown="use_encoded_value"
+                    unknown_value=np.nan,
+                    handle_unknown="use_encoded_value",
+                    dtype=encoded_dtype(train_x),
                 ),
             )
         )
@@ -69,17 +76,19 @@ class AutoSklearn(Tool):
             "Categorical" if x.name in {"object", "category"} else "Numerical"
             for x in train_x.dtypes
         ]
-        train_x = pipeline.fit_transform(train_x)
+        with stage("encode"):
+            train_x = pipeline.fit_transform(train_x)
         classifier = AutoSklearnClassifier(**params.input_params)
-        classifier.fit(train_x, train_y, feat_type=feat_type)
+        with stage("fit"):
+            classifier.fit(train_x, train_y, feat_type=feat_type)
 
         pipeline.steps.append(("classifier", classifier))
         return pipeline
 
     @staticmethod
     def eval(pipeline: Pipeline, test_x, test_y, task="classification"):
-        oridinal_encoder = pipeline.steps[0][1]
-        classifier = pipeline.steps[1][1]
+        oridinal_encoder = pipeline[:-1]
+        classifier = pipeline.steps[-1][1]
         test_x = oridinal_encoder.transform(test_x)
         y_pred = classifier.predict(test_x)
         if task == "classification":
@@ -99,8 +108,9 @@ class Predictor(BasePredictor):
     def load_automl(self, model_path):
         with open(model_path, "rb") as r_f:
             self.pipeline: AutoSklearnClassifier = pickle.load(r_f)
-        self.oridinal_encoder = self.pipeline.steps[0][1]
-        self.automl = self.pipeline.steps[1][1]
+        # encoding steps before the classifier
+        self.oridinal_encoder = self.pipeline[:-1]
+        self.automl = self.pipeline.steps[-1][1]
 
     def predict(self, inputs):
         if isinstance(self.automl, AutoSklearnClassifier):
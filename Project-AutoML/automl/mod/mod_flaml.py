@@ -23,6 +23,7 @@ from flaml import AutoML
 
 from automl.metrics import eval_classification_metrics
 from automl.mod.tool import BasePredictor, Tool
+from automl.profiling import stage
 from automl.params import Params
 
 
@@ -56,24 +57,30 @@ class FLAML(Tool):
     }
 
     @staticmethod
-    def train_automl(train_x, train_y, other_params=None, **kwargs):
+    def train_automl(
+        train_x, train_y, other_params=None, encoder_options=None, **kwargs
+    ):
+        # flaml encodes categorical columns itself, encoder_options are unused
         params = Params(param_str=other_params, **kwargs)
         automl = AutoML(**params.input_params)
         automl.predict
         train_y = convert_y(train_y)
-        automl.fit(train_x, train_y)
+        with stage("fit"):
+            automl.fit(train_x, train_y)
 
         return automl
 
     @staticmethod
     def eval_automl(automl: AutoML, test_x, test_y, task="classification"):
-        y_pred = automl.predict(test_x)
+        with stage("predict"):
+            y_pred = automl.predict(test_x)
 
         test_y = convert_y(test_y)
-        if task == "classification":
-            metrics = eval_classification_metrics(test_y, y_pred)
-        else:
-            metrics = Tool.eval_automl(automl, test_x, test_y)
+        with stage("eval"):
+            if task == "classification":
+                metrics = eval_classification_metrics(test_y, y_pred)
+            else:
+                metrics = Tool.eval_automl(automl, test_x, test_y)
         return metrics
 
     @staticmethod
@@ -36,7 +36,9 @@ class Tool:
     }
 
     @staticmethod
-    def train_automl(train_x, train_y, other_params=None, **kwargs):
+    def train_automl(
+        train_x, train_y, other_params=None, encoder_options=None, **kwargs
+    ):
         raise NotImplementedError
 
     @staticmethod
@@ -0,0 +1,327 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+
+import mlflow
+from mlflow.entities import ViewType
+from mlflow.exceptions import MlflowException
+from mlflow.store.artifact.artifact_repository_registry import get_artifact_repository
+from mlflow.store.artifact.runs_artifact_repo import RunsArtifactRepository
+
+from automl.profiling import stage
+from automl.upload import DEFAULT_UPLOAD_TIMEOUT
+
+logger = getLogger(__name__)
+
+# independent registry requests run in parallel
+REGISTRY_WORKERS = 4
+# run ids per search_runs request, bounded by the length of the filter
+SEARCH_RUNS_BATCH = 100
+# metrics of model versions are cached as registered model tags with this prefix
+METRIC_TAG_PREFIX = "version_metrics"
+# stages of the versions a retention policy may delete
+PRUNABLE_STAGES = ("Archived", "None")
+# versions deleted in parallel before the next batch
+PRUNE_BATCH = 50
+
+
+def metric_tag(key_metrics, version):
+    return f"{METRIC_TAG_PREFIX}.{key_metrics}.{version}"
+
+
+def list_experiment_ids(client):
+    """
+    ids of every experiment, page by page
+    """
+    experiment_ids = []
+    page_token = None
+    while True:
+        page = client.search_experiments(
+            view_type=ViewType.ALL, page_token=page_token
+        )
+        experiment_ids.extend(experiment.experiment_id for experiment in page)
+        page_token = page.token
+        if not page_token:
+            break
+    return experiment_ids
+
+
+def search_run_metrics(client, run_ids, key_metrics):
+    """
+    key_metrics of runs, read from a run not found yet, then searched for
+    in its experiment with one search_runs request per SEARCH_RUNS_BATCH runs,
+    so only the experiments of the runs are searched
+    """
+
+    def search(experiment_id, batch):
+        id_list = ", ".join(f"'{run_id}'" for run_id in batch)
+        return client.search_runs(
+            [experiment_id],
+            filter_string=f"attributes.run_id IN ({id_list})",
+            run_view_type=ViewType.ALL,
+            max_results=len(batch),
+        )
+
+    runs = []
+    remaining = sorted(set(run_ids))
+    while remaining:
+        run_id, remaining = remaining[0], remaining[1:]
+        try:
+            run = client.get_run(run_id)
+        except MlflowException as e:
+            logger.warning("can not get run %s: %s", run_id, e)
+            continue
+        runs.append(run)
+        # the other runs are most likely in the same experiment
+        experiment_id = run.info.experiment_id
+        batches = [
+            remaining[i : i + SEARCH_RUNS_BATCH]
+            for i in range(0, len(remaining), SEARCH_RUNS_BATCH)
+        ]
+        with ThreadPoolExecutor(max_workers=REGISTRY_WORKERS) as executor:
+            for found in executor.map(lambda b: search(experiment_id, b), batches):
+                runs.extend(found)
+        found_ids = {run.info.run_id for run in runs}
+        remaining = [run_id for run_id in remaining if run_id not in found_ids]
+
+    return {
+        run.info.run_id: run.data.metrics[key_metrics]
+        for run in runs
+        if key_metrics in run.data.metrics
+    }
+
+
+def get_version_metrics(client, model_name, versions, key_metrics, model_tags):
+    """
+    key_metrics of every version, from the tags of the registered model and
+    from the runs of the versions not cached yet, which are cached in turn.
+    A tag holds run_id:metric, so that it is ignored for another version
+    registered with the same number
+    """
+    version_metrics = {}
+    missing = []
+    for version in versions:
+        cached = model_tags.get(metric_tag(key_metrics, version.version), "")
+        run_id, _, metric = cached.partition(":")
+        if metric and run_id == version.run_id:
+            version_metrics[version.version] = float(metric)
+        else:
+            missing.append(version)
+
+    run_metrics = search_run_metrics(
+        client, [version.run_id for version in missing], key_metrics
+    )
+    new_tags = {}
+    for version in missing:
+        if version.run_id not in run_metrics:
+            logger.warning("version %s has no %s", version.version, key_metrics)
+            continue
+        version_metrics[version.version] = run_metrics[version.run_id]
+        new_tags[metric_tag(key_metrics, version.version)] = (
+            f"{version.run_id}:{run_metrics[version.run_id]}"
+        )
+
+    with ThreadPoolExecutor(max_workers=REGISTRY_WORKERS) as executor:
+        list(
+            executor.map(
+                lambda item: client.set_registered_model_tag(model_name, *item),
+                new_tags.items(),
+            )
+        )
+    return version_metrics
+
+
+def create_model_version(
+    model_name,
+    key_metrics=None,
+    run_id=None,
+    auto_replace=True,
+    artifact_path="sklearn_model",
+    upload=None,
+    upload_timeout=DEFAULT_UPLOAD_TIMEOUT,
+):
+    """
+    register the model of run_id and move the Production stage to it, or to
+    the version with the best key_metrics, the previous Production versions
+    are archived, an ArtifactUpload of the model is only waited for before
+    the model is registered
+    """
+    client = mlflow.tracking.MlflowClient()
+    filter_string = "name='{}'".format(model_name)
+    versions = list(client.search_model_versions(filter_string))
+
+    model_tags = {}
+    if versions:
+        model_tags = client.get_registered_model(model_name).tags
+    else:
+        client.create_registered_model(model_name)
+
+    if run_id:
+        if upload is not None:
+            with stage("upload_wait"):
+                upload.wait(upload_timeout)
+        uri = f"runs:/{run_id}/{artifact_path}"
+        versions.append(mlflow.register_model(uri, model_name))
+
+    if key_metrics:
+        version2metrics = get_version_metrics(
+            client, model_name, versions, key_metrics, model_tags
+        )
+        logger.info(f"version2metrics({key_metrics}): {version2metrics}")
+        if not version2metrics:
+            raise ValueError(f"no version of {model_name} has {key_metrics}")
+        best_version = max(version2metrics.items(), key=lambda x: x[1])[0]
+    elif run_id:
+        best_version = versions[-1].version
+        logger.info("register last version to Production")
+    else:
+        best_version = None
+
+    stages = {str(version.version): version.current_stage for version in versions}
+    archived = [
+        version
+        for version, stage in stages.items()
+        if stage == "Production" and version != str(best_version)
+    ]
+    with ThreadPoolExecutor(max_workers=REGISTRY_WORKERS) as executor:
+        list(
+            executor.map(
+                lambda version: client.transition_model_version_stage(
+                    model_name, version=version, stage="Archived"
+                ),
+                archived,
+            )
+        )
+
+    if best_version is not None and stages[str(best_version)] != "Production":
+        logger.info("register version: %s to Production", best_version)
+        client.transition_model_version_stage(
+            model_name, version=best_version, stage="Production"
+        )
+
+    return versions
+
+
+def select_pruned_versions(
+    versions, version_metrics=None, keep_last=0, keep_top=0, max_age_days=0
+):
+    """
+    archived and unstaged versions kept by none of the rules: the keep_last
+    latest versions, the keep_top best versions by version_metrics and the
+    versions younger than max_age_days, nothing is pruned without a rule
+    """
+    if not (keep_last or keep_top or max_age_days):
+        return []
+
+    versions = sorted(versions, key=lambda version: int(version.version), reverse=True)
+    kept = {str(version.version) for version in versions[:keep_last]}
+    if keep_top and version_metrics:
+        best = sorted(version_metrics.items(), key=lambda x: x[1], reverse=True)
+        kept.update(str(version) for version, _ in best[:keep_top])
+    if max_age_days:
+        min_timestamp = (time.time() - max_age_days * 24 * 3600) * 1000
+        kept.update(
+            str(version.version)
+            for version in versions
+            if version.creation_timestamp >= min_timestamp
+        )
+    return [
+        version
+        for version in versions
+        if version.current_stage in PRUNABLE_STAGES and str(version.version) not in kept
+    ]
+
+
+def delete_artifacts(source):
+    if source.startswith("runs:/"):
+        source = RunsArtifactRepository.get_underlying_uri(source)
+    get_artifact_repository(source).delete_artifacts()
+
+
+def prune_model_versions(
+    model_name,
+    keep_last=0,
+    keep_top=0,
+    max_age_days=0,
+    key_metrics=None,
+    dry_run=False,
+):
+    """
+    delete the versions of model_name pruned by the retention policy,
+    see select_pruned_versions, with the model artifacts they registered
+    unless a kept version shares them, dry_run only logs the versions.
+    Return the pruned versions
+    """
+    client = mlflow.tracking.MlflowClient()
+    versions = list(client.search_model_versions("name='{}'".format(model_name)))
+    model_tags = client.get_registered_model(model_name).tags
+
+    version_metrics = None
+    if keep_top and key_metrics:
+        version_metrics = get_version_metrics(
+            client, model_name, versions, key_metrics, model_tags
+        )
+    pruned = select_pruned_versions(
+        versions,
+        version_metrics,
+        keep_last=keep_last,
+        keep_top=keep_top,
+        max_age_days=max_age_days,
+    )
+    pruned_names = [str(version.version) for version in pruned]
+    if dry_run or not pruned:
+        logger.info("versions to prune (dry run %s): %s", dry_run, pruned_names)
+        return pruned
+
+    kept_sources = {
+        version.source
+        for version in versions
+        if str(version.version) not in pruned_names
+    }
+
+    def prune(version):
+        client.delete_model_version(model_name, version.version)
+        # drop the metrics cached for the version, including the ones just
+        # cached by get_version_metrics
+        metric_tags = {
+            key
+            for key in model_tags
+            if key.startswith(f"{METRIC_TAG_PREFIX}.")
+            and key.endswith(f".{version.version}")
+        }
+        if version_metrics and version.version in version_metrics:
+            metric_tags.add(metric_tag(key_metrics, version.version))
+        for key in metric_tags:
+            client.delete_registered_model_tag(model_name, key)
+        if version.source in kept_sources:
+            return
+        try:
+            delete_artifacts(version.source)
+        except Exception as e:
+            logger.warning("can not delete artifacts %s: %s", version.source, e)
+
+    for start in range(0, len(pruned), PRUNE_BATCH):
+        batch = pruned[start : start + PRUNE_BATCH]
+        with ThreadPoolExecutor(max_workers=REGISTRY_WORKERS) as executor:
+            list(executor.map(prune, batch))
+        logger.info(
+            "prune versions: %s", [str(version.version) for version in batch]
+        )
+    return pruned
@@ -0,0 +1,92 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import tempfile
+import threading
+import time
+
+from automl.profiling import profiler
+
+# seconds to wait for the model upload before failing the run
+DEFAULT_UPLOAD_TIMEOUT = 3600
+
+
+class ArtifactUpload:
+    """
+    save a model with save_func(local_path) and upload it as artifact_path of
+    run_id on a background thread, so that evaluation, metric logging and the
+    version comparison go on meanwhile, wait() blocks until it is uploaded
+    """
+
+    def __init__(self, run_id, artifact_path, save_func):
+        from mlflow.tracking import MlflowClient
+
+        # the tracking server of the run, even if it is changed meanwhile
+        self.client = MlflowClient()
+        self.run_id = run_id
+        self.artifact_path = artifact_path
+        self.save_func = save_func
+        self.timings = {}
+        self.error = None
+        # daemon so that a stuck upload does not keep the process alive
+        self._thread = threading.Thread(target=self._upload, daemon=True)
+        self._thread.start()
+
+    def _upload(self):
+        try:
+            with tempfile.TemporaryDirectory(prefix="upload-") as tmp_dir:
+                local_path = os.path.join(
+                    tmp_dir, os.path.basename(self.artifact_path)
+                )
+                start = time.perf_counter()
+                self.save_func(local_path)
+                self.timings["save_model"] = time.perf_counter() - start
+
+                start = time.perf_counter()
+                self.client.log_artifacts(
+                    self.run_id, local_path, self.artifact_path
+                )
+                self.timings["upload"] = time.perf_counter() - start
+        except Exception as e:
+            self.error = e
+
+    def wait(self, timeout=DEFAULT_UPLOAD_TIMEOUT):
+        """
+        wait at most timeout seconds for the upload, the run is marked failed
+        and an error raised if it failed or did not finish in time
+        """
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self.fail()
+            raise TimeoutError(
+                f"upload of {self.artifact_path} to run {self.run_id} "
+                f"did not finish in {timeout}s"
+            )
+        if self.error is not None:
+            self.fail()
+            raise RuntimeError(
+                f"upload of {self.artifact_path} to run {self.run_id} failed: "
+                f"{self.error}"
+            ) from self.error
+
+        for name, seconds in self.timings.items():
+            profiler.record(name, seconds)
+        return self
+
+    def fail(self):
+        self.client.set_terminated(self.run_id, status="FAILED")
@@ -0,0 +1,198 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+benchmark latency and throughput of PredictorWrapper, run from Project-AutoML:
+
+    # a logged model, load time includes mlflow.pyfunc.load_model
+    python -m benchmarks.bench_predictor --model_uri runs:/<run_id>/artifact \\
+        --data_path test.csv --output result.json
+    # a saved automl file, load time is PredictorWrapper.load_context only
+    python -m benchmarks.bench_predictor --model_path flaml.pkl \\
+        --data_path test.csv --baseline result.json
+
+only p50 latency and throughput fail the baseline comparison, the load time
+and p99 latency are reported
+"""
+
+import json
+import sys
+import time
+from types import SimpleNamespace
+
+import click
+import numpy as np
+import pandas as pd
+
+DEFAULT_BATCH_SIZES = "1,10,1000,100000"
+
+# every batch size is scored until both limits are reached
+MIN_ITERATIONS = 5
+MIN_SECONDS = 1.0
+MAX_ITERATIONS = 1000
+# the model is loaded this many times, the median load time is reported
+LOAD_REPEAT = 5
+# too noisy to fail the baseline comparison, only reported
+REPORTED_ONLY = ("load_s", "p99_ms")
+
+
+def load_predict_func(model_uri=None, model_path=None):
+    """
+    return predict function and load time in seconds
+    """
+    start = time.perf_counter()
+    if model_uri:
+        import mlflow.pyfunc
+
+        model = mlflow.pyfunc.load_model(model_uri)
+        predict_func = model.predict
+    else:
+        from predictor import PredictorWrapper
+
+        model = PredictorWrapper()
+        model.load_context(SimpleNamespace(artifacts={"model_path": model_path}))
+
+        def predict_func(model_input):
+            return model.predict(None, model_input)
+
+    return predict_func, time.perf_counter() - start
+
+
+def bench_load(model_uri=None, model_path=None, repeat=LOAD_REPEAT):
+    """
+    return predict function of the last load and median load time in seconds
+    """
+    load_times = []
+    for _ in range(max(repeat, 1)):
+        predict_func, load_s = load_predict_func(model_uri, model_path)
+        load_times.append(load_s)
+    return predict_func, float(np.median(load_times))
+
+
+def make_batch(data, batch_size, random_state=0):
+    return data.sample(
+        n=batch_size, replace=batch_size > len(data), random_state=random_state
+    ).reset_index(drop=True)
+
+
+def bench_batch(predict_func, batch):
+    # the first call may initialize lazy state of the model
+    predict_func(batch)
+
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < MAX_ITERATIONS and (
+        len(latencies) < MIN_ITERATIONS or time.perf_counter() - start < MIN_SECONDS
+    ):
+        batch_start = time.perf_counter()
+        predict_func(batch)
+        latencies.append(time.perf_counter() - batch_start)
+
+    latencies = np.array(latencies)
+    return {
+        "batch_size": len(batch),
+        "iterations": len(latencies),
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "rows_per_s": float(len(batch) / latencies.mean()),
+    }
+
+
+def compare(result, baseline, max_regression):
+    """
+    print the change of every metric, return the regressions over
+    max_regression of the metrics not in REPORTED_ONLY
+    """
+    regressions = []
+    checks = [("load_s", result["load_s"], baseline["load_s"], True)]
+    baseline_batches = {item["batch_size"]: item for item in baseline["batches"]}
+    for item in result["batches"]:
+        refer = baseline_batches.get(item["batch_size"])
+        if not refer:
+            continue
+        for key in ("p50_ms", "p99_ms", "rows_per_s"):
+            name = f"batch_{item['batch_size']}.{key}"
+            checks.append((name, item[key], refer[key], key != "rows_per_s"))
+
+    for name, value, refer_value, lower_is_better in checks:
+        change = value / refer_value - 1 if refer_value else 0.0
+        regression = change if lower_is_better else -change
+        reported_only = name.split(".")[-1] in REPORTED_ONLY
+        print(
+            f"{name:<24} {refer_value:12.3f} -> {value:12.3f} ({change:+.1%})"
+            + (" (not gated)" if reported_only else "")
+        )
+        if regression > max_regression and not reported_only:
+            regressions.append((name, change))
+    return regressions
+
+
+@click.command()
+@click.option("--model_uri", default=None)
+@click.option("--model_path", default=None)
+@click.option("--data_path")
+@click.option("--label_column", default="label")
+@click.option("--batch_sizes", default=DEFAULT_BATCH_SIZES)
+@click.option("--output", default="bench_predictor.json")
+@click.option("--baseline", default=None)
+@click.option("--max_regression", default=0.2)
+@click.option("--load_repeat", default=LOAD_REPEAT)
+def main(
+    model_uri,
+    model_path,
+    data_path,
+    label_column,
+    batch_sizes,
+    output,
+    baseline,
+    max_regression,
+    load_repeat,
+):
+    assert model_uri or model_path, "model_uri or model_path is required"
+
+    data = pd.read_csv(data_path)
+    if label_column in data.columns:
+        data = data.drop([label_column], axis=1)
+
+    predict_func, load_s = bench_load(model_uri, model_path, load_repeat)
+    print(f"load model in {load_s:.3f}s (median of {load_repeat})")
+
+    batches = []
+    for batch_size in [int(value) for value in batch_sizes.split(",")]:
+        item = bench_batch(predict_func, make_batch(data, batch_size))
+        print(json.dumps(item))
+        batches.append(item)
+
+    result = {
+        "model": model_uri or model_path,
+        "load_s": load_s,
+        "batches": batches,
+    }
+    with open(output, "w") as w_f:
+        json.dump(result, w_f, indent=2)
+    print(f"write benchmark results to {output}")
+
+    if baseline:
+        with open(baseline, "r") as r_f:
+            regressions = compare(result, json.load(r_f), max_regression)
+        if regressions:
+            print(f"regressions over {max_regression:.0%}: {regressions}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,12 +16,19 @@
 # under the License.
 
 import logging
+from functools import partial
 
 import click
 import mlflow
 import mlflow.sklearn
 
-from automl.data import load_data
+from automl.cache import DEFAULT_CACHE_MAX_MB
+from automl.data import load_data, parse_columns
+from automl.encoders import DEFAULT_HASH_BUCKETS
+from automl.files import list_shards
+from automl.profiling import profiler, stage
+from automl.registry import create_model_version, prune_model_versions
+from automl.upload import DEFAULT_UPLOAD_TIMEOUT, ArtifactUpload
 
 
 logging.basicConfig(
@@ -49,49 +56,6 @@ def get_tool(tool_name):
     return Tool
 
 
-def create_model_version(model_name, key_metrics=None, run_id=None, auto_replace=True):
-    client = mlflow.tracking.MlflowClient()
-    filter_string = "name='{}'".format(model_name)
-    versions = client.search_model_versions(filter_string)
-
-    if not versions:
-        client.create_registered_model(model_name)
-
-    for version in versions:
-        if version.current_stage == "Production":
-            client.transition_model_version_stage(
-                model_name, version=version.version, stage="Archived"
-            )
-
-    if run_id:
-        uri = f"runs:/{run_id}/{ARTIFACT_TAG}"
-        mv = mlflow.register_model(uri, model_name)
-
-        if not key_metrics:
-            client.transition_model_version_stage(
-                model_name, version=mv.version, stage="Production"
-            )
-            logger.info("register last version to Production")
-
-    if key_metrics:
-        version2metrics = []
-        versions = client.search_model_versions(filter_string)
-        for version in versions:
-            metrics = client.get_run(version.run_id).data.metrics[key_metrics]
-            version2metrics.append((version.version, metrics))
-
-        logger.info(f"version2metrics({key_metrics}): {version2metrics}")
-
-        best_version = max(version2metrics, key=lambda x: x[1])[0]
-
-        logger.info("register version: %s to Production", best_version)
-        client.transition_model_version_stage(
-            model_name, version=best_version, stage="Production"
-        )
-
-    return versions
-
-
 @click.command()
 @click.option("--tool")
 @click.option("--data_path")
@@ -99,6 +63,27 @@ def create_model_version(model_name, key_metrics=None, run_id=None, auto_replace
 @click.option("--model_name", default=None)
 @click.option("--random_state", default=0)
 @click.option("--params", default=None)
+@click.option("--use_cache", type=bool, default=True)
+@click.option("--cache_dir", default=None)
+@click.option("--cache_max_mb", type=float, default=DEFAULT_CACHE_MAX_MB)
+@click.option("--columns", default=None)
+@click.option("--dtype_mode", default="default")
+@click.option("--schema_file", default=None)
+@click.option("--split_mode", default="memory")
+@click.option("--split_key", default=None)
+@click.option("--stratify", type=bool, default=False)
+@click.option("--shard_workers", default=0)
+@click.option("--profile_memory", type=bool, default=False)
+@click.option("--min_frequency", type=float, default=0)
+@click.option("--max_categories", default=0)
+@click.option("--hash_columns", default=None)
+@click.option("--hash_threshold", default=0)
+@click.option("--hash_buckets", default=DEFAULT_HASH_BUCKETS)
+@click.option("--keep_versions", default=0)
+@click.option("--keep_top_versions", default=0)
+@click.option("--keep_days", type=float, default=0)
+@click.option("--prune_dry_run", type=bool, default=False)
+@click.option("--upload_timeout", type=float, default=DEFAULT_UPLOAD_TIMEOUT)
 def main(
     tool,
     data_path,
@@ -106,36 +91,116 @@ def main(
     model_name,
     random_state,
     params,
+    use_cache,
+    cache_dir,
+    cache_max_mb,
+    columns,
+    dtype_mode,
+    schema_file,
+    split_mode,
+    split_key,
+    stratify,
+    shard_workers,
+    profile_memory,
+    min_frequency,
+    max_categories,
+    hash_columns,
+    hash_threshold,
+    hash_buckets,
+    keep_versions,
+    keep_top_versions,
+    keep_days,
+    prune_dry_run,
+    upload_timeout,
 ):
 
     Tool = get_tool(tool)
 
-    train_x, train_y, test_x, test_y = load_data(
-        data_path, label_column, random_state=random_state
-    )
-
-    automl = Tool.train_automl(train_x, train_y, other_params=params)
+    profiler.sample_memory = profile_memory
+
+    with stage("load"):
+        train_x, train_y, test_x, test_y = load_data(
+            data_path,
+            label_column,
+            random_state=random_state,
+            use_cache=use_cache,
+            cache_dir=cache_dir or None,
+            cache_max_mb=cache_max_mb,
+            columns=parse_columns(columns),
+            dtype_mode=dtype_mode,
+            schema_file=schema_file or None,
+            split_mode=split_mode,
+            split_key=split_key or None,
+            stratify=stratify,
+            shard_workers=shard_workers,
+        )
 
-    metrics = Tool.eval_automl(automl, test_x, test_y)
-    logger.info(f"metrics: {metrics}")
-    mlflow.log_metrics(metrics)
+    encoder_options = dict(
+        min_frequency=min_frequency,
+        max_categories=max_categories,
+        hash_columns=parse_columns(hash_columns),
+        hash_threshold=hash_threshold,
+        hash_buckets=hash_buckets,
+    )
+    with stage("train"):
+        automl = Tool.train_automl(
+            train_x, train_y, other_params=params, encoder_options=encoder_options
+        )
 
-    Tool.save_automl(automl, Tool.model_path)
+    with stage("save_model"):
+        Tool.save_automl(automl, Tool.model_path)
 
     from predictor import PredictorWrapper
 
     artifacts = {"model_path": Tool.model_path}
 
-    model_info = mlflow.pyfunc.log_model(
-        artifact_path=ARTIFACT_TAG,
-        python_model=PredictorWrapper(),
-        artifacts=artifacts,
-        conda_env=Tool.conda_env,
-        code_path=["automl/", "predictor.py"],
-    )
-    if model_name:
-        create_model_version(
-            model_name, key_metrics='f1-score', run_id=model_info.run_id)
+    # the run only ends once the model is uploaded, failed if it is not
+    with mlflow.start_run() as run:
+        run_id = run.info.run_id
+        # the model is packaged and uploaded while it is evaluated
+        upload = ArtifactUpload(
+            run_id,
+            ARTIFACT_TAG,
+            partial(
+                mlflow.pyfunc.save_model,
+                python_model=PredictorWrapper(),
+                artifacts=artifacts,
+                conda_env=Tool.conda_env,
+                code_path=["automl/", "predictor.py"],
+            ),
+        )
+
+        with stage("evaluate"):
+            metrics = Tool.eval_automl(automl, test_x, test_y)
+        logger.info(f"metrics: {metrics}")
+        mlflow.log_param("data_shards", len(list_shards(data_path)))
+        mlflow.log_metrics(metrics)
+
+        if model_name:
+            with stage("register"):
+                create_model_version(
+                    model_name,
+                    key_metrics='f1-score',
+                    run_id=run_id,
+                    artifact_path=ARTIFACT_TAG,
+                    upload=upload,
+                    upload_timeout=upload_timeout,
+                )
+            if keep_versions or keep_top_versions or keep_days:
+                with stage("prune"):
+                    prune_model_versions(
+                        model_name,
+                        keep_last=keep_versions,
+                        keep_top=keep_top_versions,
+                        max_age_days=keep_days,
+                        key_metrics='f1-score',
+                        dry_run=prune_dry_run,
+                    )
+        else:
+            with stage("upload_wait"):
+                upload.wait(upload_timeout)
+
+    profiler.log(run_id)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,190 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+benchmark load, encode, fit, predict, eval and log_model of the trainers
+on synthetic data, run from Project-BasicAlgorithm:
+
+    python -m benchmarks.bench_training --rows 1000,10000 --output result.json
+    python -m benchmarks.bench_training --baseline result.json
+
+everything is logged to a local file based mlflow store, no server needed
+"""
+
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import click
+import mlflow
+import mlflow.sklearn
+
+from benchmarks.datagen import write_classification_data
+from core.data import load_data
+from core.profiling import MemorySampler, profiler, stage
+
+ALGORITHMS = ("lr", "svm", "lightgbm", "xgboost")
+
+# timings shorter than this are too noisy to compare against the baseline
+MIN_COMPARE_SECONDS = 0.05
+# seed of the train/test and validation splits, the same for every run
+RANDOM_STATE = 1
+
+
+def get_environment():
+    versions = {}
+    for name in ("numpy", "pandas", "sklearn", "lightgbm", "xgboost", "mlflow"):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": versions,
+    }
+
+
+def run_one(algorithm, data_path, label_column="label"):
+    from core.training import get_training_func
+
+    profiler.reset()
+    sampler = MemorySampler()
+    sampler.start()
+    start = time.perf_counter()
+
+    with stage("load"):
+        train_x, train_y, test_x, test_y = load_data(
+            data_path, label_column, random_state=RANDOM_STATE, use_cache=False
+        )
+    training_func = get_training_func(algorithm)
+    with mlflow.start_run():
+        model, metrics = training_func(
+            train_x,
+            train_y,
+            test_x,
+            test_y,
+            search_options=dict(random_state=RANDOM_STATE),
+        )
+        with stage("log_model"):
+            mlflow.sklearn.log_model(model, artifact_path="sklearn_model")
+
+    result = profiler.metrics()
+    result["time.total_s"] = time.perf_counter() - start
+    result["mem.peak_mb"] = sampler.stop()
+    result["f1-score"] = metrics["f1-score"]
+    return result
+
+
+def compare(results, baseline, max_regression):
+    """
+    compare timings and peak memory of every (algorithm, rows)
+    """
+    baseline_results = {
+        (item["algorithm"], item["rows"]): item for item in baseline["results"]
+    }
+    regressions = []
+    for item in results:
+        refer = baseline_results.get((item["algorithm"], item["rows"]))
+        if not refer:
+            continue
+        for key, value in item.items():
+            if not key.startswith(("time.", "mem.peak_mb")) or key not in refer:
+                continue
+            if key.startswith("time.") and refer[key] < MIN_COMPARE_SECONDS:
+                continue
+            ratio = value / refer[key] if refer[key] else 1.0
+            print(
+                f"{item['algorithm']:>8} rows={item['rows']:<8} {key:<18} "
+                f"{refer[key]:10.3f} -> {value:10.3f} ({ratio - 1:+.1%})"
+            )
+            if ratio > 1 + max_regression:
+                regressions.append((item["algorithm"], item["rows"], key, ratio))
+    return regressions
+
+
+@click.command()
+@click.option("--algorithms", default=",".join(ALGORITHMS))
+@click.option("--rows", default="1000,10000,50000")
+@click.option("--numeric_columns", default=10)
+@click.option("--categorical_columns", default=5)
+@click.option("--cardinality", default=20)
+@click.option("--repeat", default=1)
+@click.option("--output", default="bench_training.json")
+@click.option("--baseline", default=None)
+@click.option("--max_regression", default=0.2)
+@click.option("--work_dir", default=None)
+def main(
+    algorithms,
+    rows,
+    numeric_columns,
+    categorical_columns,
+    cardinality,
+    repeat,
+    output,
+    baseline,
+    max_regression,
+    work_dir,
+):
+    work_dir = work_dir or tempfile.mkdtemp(prefix="bench-training-")
+    mlflow.set_tracking_uri("file:" + os.path.join(os.path.abspath(work_dir), "mlruns"))
+    mlflow.set_experiment("bench_training")
+
+    results = []
+    for num_rows in [int(value) for value in rows.split(",")]:
+        data_path = os.path.join(work_dir, f"data_{num_rows}.csv")
+        write_classification_data(
+            data_path,
+            num_rows,
+            numeric_columns=numeric_columns,
+            categorical_columns=categorical_columns,
+            cardinality=cardinality,
+        )
+        for algorithm in algorithms.split(","):
+            runs = [run_one(algorithm, data_path) for _ in range(repeat)]
+            # best of the repeated runs is the least noisy estimate
+            result = {key: min(run[key] for run in runs) for key in runs[0]}
+            result.update(
+                algorithm=algorithm,
+                rows=num_rows,
+                numeric_columns=numeric_columns,
+                categorical_columns=categorical_columns,
+                cardinality=cardinality,
+                repeat=repeat,
+            )
+            print(json.dumps(result, sort_keys=True))
+            results.append(result)
+
+    report = {"environment": get_environment(), "results": results}
+    with open(output, "w") as w_f:
+        json.dump(report, w_f, indent=2, sort_keys=True)
+    print(f"write benchmark results to {output}")
+
+    if baseline:
+        with open(baseline, "r") as r_f:
+            regressions = compare(results, json.load(r_f), max_regression)
+        if regressions:
+            print(f"regressions over {max_regression:.0%}: {regressions}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import numpy as np
+import pandas as pd
+
+
+def make_classification_data(
+    rows,
+    numeric_columns=10,
+    categorical_columns=5,
+    cardinality=20,
+    label_column="label",
+    random_state=0,
+):
+    """
+    synthetic binary classification data, the label depends on
+    both numeric and categorical columns so every trainer has signal to learn
+    """
+    rng = np.random.RandomState(random_state)
+    data = {}
+    logits = np.zeros(rows)
+
+    for index in range(numeric_columns):
+        values = rng.normal(size=rows)
+        logits += rng.normal() * values
+        data[f"num_{index}"] = values
+
+    for index in range(categorical_columns):
+        codes = rng.randint(0, cardinality, size=rows)
+        effects = rng.normal(size=cardinality)
+        logits += effects[codes]
+        data[f"cat_{index}"] = np.char.add(f"c{index}_", codes.astype(str))
+
+    logits += rng.normal(scale=0.5, size=rows)
+    data[label_column] = (logits > np.median(logits)).astype(int)
+    return pd.DataFrame(data)
+
+
+def write_classification_data(path, rows, **kwargs):
+    data = make_classification_data(rows, **kwargs)
+    data.to_csv(path, index=False)
+    return path
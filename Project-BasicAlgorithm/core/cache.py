@@ -0,0 +1,139 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+
+from core.files import is_glob
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "DS_MLFLOW_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "dolphinscheduler-mlflow"),
+)
+DEFAULT_CACHE_MAX_MB = 10240
+
+# bytes hashed from the head and the tail of every input file
+FINGERPRINT_BLOCK_SIZE = 1 << 20
+
+
+def file_fingerprint(path, block_size=FINGERPRINT_BLOCK_SIZE):
+    """
+    fingerprint a file, a glob pattern or a directory by path, size, mtime
+    and sampled content
+    """
+    if is_glob(path):
+        paths = sorted(glob.glob(path, recursive=True))
+    elif os.path.isdir(path):
+        paths = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+    else:
+        paths = [path]
+
+    sha = hashlib.sha1()
+    for file_path in paths:
+        stat = os.stat(file_path)
+        sha.update(os.path.abspath(file_path).encode())
+        sha.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+        with open(file_path, "rb") as r_f:
+            sha.update(r_f.read(block_size))
+            if stat.st_size > 2 * block_size:
+                r_f.seek(-block_size, os.SEEK_END)
+                sha.update(r_f.read(block_size))
+    return sha.hexdigest()
+
+
+def make_cache_key(*parts, **options):
+    payload = json.dumps([parts, options], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class DirectoryCache:
+    """
+    a directory of cache entries with size-bounded LRU eviction,
+    every entry is a sub directory named by its key
+    """
+
+    def __init__(self, cache_dir=None, max_mb=DEFAULT_CACHE_MAX_MB, namespace=""):
+        self.cache_dir = os.path.join(cache_dir or DEFAULT_CACHE_DIR, namespace)
+        self.max_bytes = int(float(max_mb) * 1024 * 1024)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        path = self.entry_path(key)
+        if not os.path.isdir(path):
+            return None
+        # mark entry as recently used
+        os.utime(path)
+        return path
+
+    def put(self, key, write_func):
+        """
+        write_func(tmp_dir) writes the entry, the entry is published atomically
+        """
+        path = self.entry_path(key)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        try:
+            write_func(tmp_path)
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # another process published the same entry first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict(keep=key)
+        return path
+
+    def entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if ".tmp-" in name or not os.path.isdir(path):
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(root, file_name))
+                for root, _, file_names in os.walk(path)
+                for file_name in file_names
+            )
+            entries.append((os.path.getmtime(path), size, path))
+        return entries
+
+    def evict(self, keep=None):
+        entries = sorted(self.entries())
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total_size <= self.max_bytes:
+                break
+            if keep and os.path.basename(path) == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
+            print(f"evict cache entry {path}")
+
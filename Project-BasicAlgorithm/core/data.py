@@ -16,33 +16,280 @@
 # under the License.
 
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 import pandas as pd
 from sklearn.model_selection import train_test_split
 
+from core.cache import (
+    DEFAULT_CACHE_MAX_MB,
+    DirectoryCache,
+    file_fingerprint,
+    make_cache_key,
+)
+from core.dtypes import (
+    DTYPE_MODES,
+    INFER_SAMPLE_ROWS,
+    compact_frame,
+    concat_chunks,
+    infer_categorical_columns,
+    load_schema,
+    read_compact_batches,
+    read_compact_csv,
+)
+from core.files import (
+    DATA_SUFFIXES,
+    get_data_format,
+    get_dataset_source,
+    list_shards,
+)
+from core.split import SPLIT_CHUNK_ROWS, SPLIT_MODES, hash_split_data, iter_chunks
+
 PATH_ERROR_MESSAGE = (
-    "data_path only support csv data or directory contained train.csv and test.csv"
+    "data_path only support csv/parquet/feather data, partitioned parquet/feather "
+    "directory or directory contained train and test data"
 )
 
 
-def load_data(data_path, label_column, test_size=0.25, random_state=1):
-    if os.path.isdir(data_path):
-        train_path = os.path.join(data_path, "train.csv")
-        test_path = os.path.join(data_path, "test.csv")
-        assert os.path.exists(train_path) and os.path.exists(
-            test_path
-        ), PATH_ERROR_MESSAGE
+CACHED_FRAMES = ("train_x", "train_y", "test_x", "test_y")
+
+
+def load_data(
+    data_path,
+    label_column,
+    test_size=0.25,
+    random_state=1,
+    use_cache=True,
+    cache_dir=None,
+    cache_max_mb=DEFAULT_CACHE_MAX_MB,
+    split_mode="memory",
+    split_key=None,
+    stratify=False,
+    **read_options,
+):
+    """
+    split_mode: memory for train_test_split, hash for the out-of-core hash split
+    read_options: columns, dtype_mode, schema_file and shard_workers, see read_data
+    """
+    split_options = dict(split_mode=split_mode, split_key=split_key, stratify=stratify)
+    if not use_cache or not list_shards(data_path):
+        return parse_data(
+            data_path,
+            label_column,
+            test_size,
+            random_state,
+            **split_options,
+            **read_options,
+        )
+
+    cache = DirectoryCache(cache_dir, max_mb=cache_max_mb, namespace="data")
+    key = get_data_key(
+        data_path,
+        label_column,
+        test_size,
+        random_state,
+        **split_options,
+        **read_options,
+    )
+    entry_path = cache.get(key)
+    if entry_path:
+        print(f"load cached data from {entry_path}")
+        return read_cached_frames(entry_path)
+
+    split_cache = DirectoryCache(cache_dir, max_mb=cache_max_mb, namespace="split")
+    frames = parse_data(
+        data_path,
+        label_column,
+        test_size,
+        random_state,
+        split_cache=split_cache,
+        **split_options,
+        **read_options,
+    )
+    cache.put(key, lambda path: write_cached_frames(path, frames))
+    print(f"cache data to {cache.entry_path(key)}")
+    return frames
+
+
+def get_data_key(
+    data_path,
+    label_column,
+    test_size=0.25,
+    random_state=1,
+    split_mode="memory",
+    split_key=None,
+    stratify=False,
+    **read_options,
+):
+    """
+    cache key of the data split by load_data with the same arguments
+    """
+    schema_file = read_options.get("schema_file")
+    return make_cache_key(
+        file_fingerprint(data_path),
+        schema_file and file_fingerprint(schema_file),
+        label_column=label_column,
+        test_size=test_size,
+        random_state=random_state,
+        split_mode=split_mode,
+        split_key=split_key,
+        stratify=stratify,
+        **{k: v for k, v in read_options.items() if k != "shard_workers"},
+    )
+
+
+def load_split_paths(
+    data_path,
+    label_column,
+    test_size=0.25,
+    random_state=1,
+    use_cache=True,
+    cache_dir=None,
+    cache_max_mb=DEFAULT_CACHE_MAX_MB,
+    split_key=None,
+    stratify=False,
+    columns=None,
+    output_dir=None,
+):
+    """
+    train and test paths for streaming training without loading the data,
+    data without train and test parts is split out-of-core by hash,
+    without cache the partitions go to output_dir owned by the caller
+    """
+    split_paths = find_split_paths(data_path)
+    if split_paths:
+        return split_paths
+
+    data_format = get_data_format(data_path)
+    if not data_format:
+        raise Exception(PATH_ERROR_MESSAGE)
+
+    cache = None
+    if use_cache:
+        cache = DirectoryCache(cache_dir, max_mb=cache_max_mb, namespace="split")
+    print(f"hash split data from {data_path}")
+    return hash_split_data(
+        data_path,
+        data_format,
+        label_column,
+        test_size=test_size,
+        random_state=random_state,
+        split_key=split_key,
+        stratify=stratify,
+        columns=get_usecols(columns, label_column),
+        cache=cache,
+        output_dir=output_dir,
+    )
+
+
+def iter_frames(data_path, columns=None, chunk_rows=SPLIT_CHUNK_ROWS):
+    """
+    read data chunk by chunk as pandas frames, memory is bounded by chunk_rows
+    """
+    data_format = get_data_format(data_path)
+    for chunk in iter_chunks(data_path, data_format, columns, chunk_rows):
+        if not isinstance(chunk, pd.DataFrame):
+            chunk = chunk.to_pandas()
+        yield chunk
+
+
+def parse_columns(columns):
+    """
+    comma separated column names to list, None means all columns
+    """
+    if not columns:
+        return None
+    columns = [column.strip() for column in columns.split(",") if column.strip()]
+    return columns or None
+
+
+def write_cached_frames(path, frames):
+    import pyarrow as pa
+    from pyarrow import feather
+
+    for name, frame in zip(CACHED_FRAMES, frames):
+        # uncompressed feather files can be memory-mapped on read, a single
+        # record batch keeps every column contiguous for zero-copy reads
+        table = pa.Table.from_pandas(frame)
+        feather.write_feather(
+            table,
+            os.path.join(path, f"{name}.feather"),
+            compression="uncompressed",
+            chunksize=max(table.num_rows, 1),
+        )
+
+
+def read_cached_frames(path, shared=False):
+    """
+    with shared, numeric columns without missing values are read-only views
+    of the memory-mapped files instead of copies, so processes reading the
+    same files share their pages
+    """
+    from pyarrow import feather
+
+    frames = []
+    for name in CACHED_FRAMES:
+        table = feather.read_table(
+            os.path.join(path, f"{name}.feather"), memory_map=True
+        )
+        frames.append(table.to_pandas(split_blocks=shared))
+    return tuple(frames)
+
 
+def parse_data(
+    data_path,
+    label_column,
+    test_size=0.25,
+    random_state=1,
+    split_mode="memory",
+    split_key=None,
+    stratify=False,
+    split_cache=None,
+    **read_options,
+):
+    assert split_mode in SPLIT_MODES, f"split_mode only support {SPLIT_MODES}"
+    split_paths = find_split_paths(data_path)
+    data_format = get_data_format(data_path)
+    split_dir = None
+    if not split_paths and data_format and split_mode == "hash":
+        if split_cache is None:
+            # the partitions are only kept until they are loaded
+            split_dir = tempfile.TemporaryDirectory(prefix="hash-split-")
+        print(f"hash split data from {data_path}")
+        split_paths = hash_split_data(
+            data_path,
+            data_format,
+            label_column,
+            test_size=test_size,
+            random_state=random_state,
+            split_key=split_key,
+            stratify=stratify,
+            columns=get_usecols(read_options.get("columns"), label_column),
+            cache=split_cache,
+            output_dir=split_dir and split_dir.name,
+        )
+
+    if split_paths:
+        train_path, test_path = split_paths
         print(f"load train data from {train_path}")
         print(f"load test data from {test_path}")
-        train_x, train_y = load_csv_data(train_path, label_column)
-        test_x, test_y = load_csv_data(test_path, label_column)
+        train_x, train_y = load_xy_data(train_path, label_column, **read_options)
+        test_x, test_y = load_xy_data(test_path, label_column, **read_options)
+        if split_dir is not None:
+            split_dir.cleanup()
 
-    elif data_path.endswith(".csv"):
+    elif data_format:
         print(f"load data from {data_path}")
         print("split data to train set and test set")
-        train_x, train_y, test_x, test_y = load_split_csv_data(
-            data_path, label_column, test_size=test_size, random_state=random_state
+        train_x, train_y, test_x, test_y = load_split_data(
+            data_path,
+            label_column,
+            test_size=test_size,
+            random_state=random_state,
+            stratify=stratify,
+            **read_options,
         )
 
     else:
@@ -51,20 +298,157 @@ def load_data(data_path, label_column, test_size=0.25, random_state=1):
     return train_x, train_y, test_x, test_y
 
 
-def load_split_csv_data(data_path, label_column, test_size=0.25, random_state=1):
+def find_split_paths(data_path):
+    """
+    train and test data inside a directory, each one is a file or partitioned directory
+    """
+    if not os.path.isdir(data_path):
+        return None
 
-    data = pd.read_csv(data_path)
-    train, test = train_test_split(data, test_size=test_size, random_state=random_state)
-    train_x = train.drop([label_column], axis=1)
-    test_x = test.drop([label_column], axis=1)
-    train_y = train[[label_column]]
-    test_y = test[[label_column]]
-    return train_x, train_y, test_x, test_y
+    for suffixes in DATA_SUFFIXES.values():
+        for suffix in suffixes:
+            train_path = os.path.join(data_path, f"train{suffix}")
+            test_path = os.path.join(data_path, f"test{suffix}")
+            if os.path.exists(train_path) and os.path.exists(test_path):
+                return train_path, test_path
+
+    train_path = os.path.join(data_path, "train")
+    test_path = os.path.join(data_path, "test")
+    if get_data_format(train_path) and get_data_format(test_path):
+        return train_path, test_path
+    return None
+
+
+def get_usecols(columns, label_column):
+    if not columns:
+        return None
+    usecols = list(columns)
+    if label_column not in usecols:
+        usecols.append(label_column)
+    return usecols
+
+
+def read_data(
+    data_path,
+    label_column,
+    columns=None,
+    dtype_mode="default",
+    schema_file=None,
+    shard_workers=0,
+):
+    """
+    columns: feature columns to read, None means all columns
+    dtype_mode: default for pandas default types, compact for downcast types
+    schema_file: json file of {column: dtype} to override inferred types
+    shard_workers: threads to read csv shards, 0 means one per cpu
+    """
+    assert dtype_mode in DTYPE_MODES, f"dtype_mode only support {DTYPE_MODES}"
+    usecols = get_usecols(columns, label_column)
+    schema = load_schema(schema_file)
+
+    data_format = get_data_format(data_path)
+    if data_format == "csv":
+        return read_csv_data(
+            list_shards(data_path),
+            usecols=usecols,
+            dtype_mode=dtype_mode,
+            schema=schema,
+            shard_workers=shard_workers,
+        )
+    return read_columnar_data(
+        data_path, data_format, columns=usecols, dtype_mode=dtype_mode, schema=schema
+    )
+
+
+def read_csv_data(
+    shards, usecols=None, dtype_mode="default", schema=None, shard_workers=0
+):
+    """
+    read csv shards concurrently with a bounded thread pool,
+    the pandas csv parser releases the GIL while tokenizing
+    """
+    categorical_columns = None
+    if dtype_mode == "compact":
+        # infer categorical columns once so that all shards agree
+        sample = pd.read_csv(shards[0], usecols=usecols, nrows=INFER_SAMPLE_ROWS)
+        categorical_columns = infer_categorical_columns(sample, schema)
+        read_func = partial(
+            read_compact_csv,
+            usecols=usecols,
+            schema=schema,
+            categorical_columns=categorical_columns,
+        )
+    else:
+        read_func = partial(pd.read_csv, usecols=usecols, dtype=schema or None)
 
+    if len(shards) == 1:
+        return read_func(shards[0])
 
-def load_csv_data(data_path, label_column):
+    max_workers = min(len(shards), shard_workers or os.cpu_count() or 1)
+    print(f"read {len(shards)} csv shards with {max_workers} threads")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        frames = list(executor.map(read_func, shards))
 
-    data = pd.read_csv(data_path)
+    data = concat_chunks(frames)
+    if dtype_mode == "compact":
+        data = compact_frame(data, schema, categorical_columns)
+    return data
+
+
+def read_columnar_data(
+    data_path, data_format, columns=None, dtype_mode="default", schema=None
+):
+    """
+    read parquet or feather data batch by batch(row group for parquet),
+    only the selected columns are read from disk
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(
+        get_dataset_source(data_path), format=data_format, partitioning="hive"
+    )
+    batches = dataset.to_batches(columns=columns)
+    if dtype_mode == "compact":
+        data = read_compact_batches(batches, schema=schema)
+    else:
+        frames = [batch.to_pandas() for batch in batches]
+        data = pd.concat(frames, ignore_index=True) if frames else None
+        if data is not None and schema:
+            data = data.astype(schema)
+
+    if data is None:
+        return dataset.head(0, columns=columns).to_pandas()
+    return data
+
+
+def split_xy(data, label_column):
     x = data.drop([label_column], axis=1)
     y = data[[label_column]]
     return x, y
+
+
+def load_split_data(
+    data_path,
+    label_column,
+    test_size=0.25,
+    random_state=1,
+    stratify=False,
+    **read_options,
+):
+
+    data = read_data(data_path, label_column, **read_options)
+    train, test = train_test_split(
+        data,
+        test_size=test_size,
+        random_state=random_state,
+        stratify=data[label_column] if stratify else None,
+    )
+    train_x, train_y = split_xy(train, label_column)
+    test_x, test_y = split_xy(test, label_column)
+    return train_x, train_y, test_x, test_y
+
+
+def load_xy_data(data_path, label_column, **read_options):
+
+    data = read_data(data_path, label_column, **read_options)
+    return split_xy(data, label_column)
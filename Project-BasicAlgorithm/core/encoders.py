@@ -0,0 +1,153 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from core.dtypes import is_text_dtype
+
+RARE_CATEGORY = "__rare__"
+DEFAULT_HASH_BUCKETS = 1024
+# fixed so that values hash to the same bucket in every process
+HASH_KEY = "dolphinscheduler"
+
+
+def select_categorical_columns(X):
+    return [
+        column
+        for column, dtype in X.dtypes.items()
+        if dtype.name == "category" or is_text_dtype(dtype)
+    ]
+
+
+def hash_to_buckets(values, n_buckets=DEFAULT_HASH_BUCKETS):
+    hashed = pd.util.hash_array(values.astype(str), hash_key=HASH_KEY)
+    return (hashed % n_buckets).astype("int64")
+
+
+class HashingBucketEncoder(BaseEstimator, TransformerMixin):
+    """
+    hashing trick, replace the values of high-cardinality columns by one of
+    n_buckets hash buckets, so the encoders after it output at most n_buckets
+    levels per column whatever the number of distinct values.
+    The columns are given, or the categorical columns with more distinct
+    values than hash_threshold.
+    """
+
+    def __init__(
+        self, columns=None, hash_threshold=None, n_buckets=DEFAULT_HASH_BUCKETS
+    ):
+        self.columns = columns
+        self.hash_threshold = hash_threshold
+        self.n_buckets = n_buckets
+
+    def fit(self, X, y=None):
+        columns = list(self.columns or [])
+        if self.hash_threshold:
+            for column in select_categorical_columns(X):
+                if column in columns:
+                    continue
+                if X[column].nunique() > self.hash_threshold:
+                    columns.append(column)
+        self.columns_ = columns
+        return self
+
+    def transform(self, X):
+        if not self.columns_:
+            return X
+        X = X.copy(deep=False)
+        # string labels, so that grouping rare buckets into RARE_CATEGORY keeps
+        # the column of a single type for the encoders
+        categories = [f"bucket_{i}" for i in range(self.n_buckets)]
+        for column in self.columns_:
+            series = X[column]
+            codes = np.full(len(series), -1, dtype="int64")
+            not_null = series.notna().to_numpy()
+            codes[not_null] = hash_to_buckets(
+                series[not_null].to_numpy(), self.n_buckets
+            )
+            X[column] = pd.Categorical.from_codes(codes, categories=categories)
+        return X
+
+
+class RareCategoryGrouper(BaseEstimator, TransformerMixin):
+    """
+    group levels of categorical columns seen less than min_frequency times
+    (a ratio of rows when below 1), or beyond the max_categories most frequent
+    levels, into RARE_CATEGORY. Levels unseen in fit are rare as well.
+    """
+
+    def __init__(self, columns=None, min_frequency=None, max_categories=None):
+        self.columns = columns
+        self.min_frequency = min_frequency
+        self.max_categories = max_categories
+
+    def fit(self, X, y=None):
+        columns = self.columns
+        if columns is None:
+            columns = select_categorical_columns(X)
+
+        min_count = self.min_frequency or 0
+        if 0 < min_count < 1:
+            min_count = min_count * len(X)
+
+        self.levels_ = {}
+        for column in columns:
+            counts = X[column].value_counts()
+            counts = counts[counts >= min_count]
+            if self.max_categories:
+                # keep one category for the rare levels
+                counts = counts.iloc[: max(self.max_categories - 1, 1)]
+            self.levels_[column] = counts.index
+        return self
+
+    def transform(self, X):
+        X = X.copy(deep=False)
+        for column, levels in self.levels_.items():
+            series = X[column]
+            is_rare = ~series.isin(levels) & series.notna()
+            if not is_rare.any():
+                continue
+            grouped = series.astype(object).where(~is_rare, RARE_CATEGORY)
+            if series.dtype.name == "category":
+                grouped = grouped.astype("category")
+            X[column] = grouped
+        return X
+
+
+def get_cardinality_steps(encoder_options=None):
+    """
+    pipeline steps put before the encoder of a trainer to bound the number of
+    levels of categorical columns
+    """
+    encoder_options = encoder_options or {}
+    steps = []
+    if encoder_options.get("hash_columns") or encoder_options.get("hash_threshold"):
+        encoder = HashingBucketEncoder(
+            columns=encoder_options.get("hash_columns"),
+            hash_threshold=encoder_options.get("hash_threshold"),
+            n_buckets=encoder_options.get("hash_buckets") or DEFAULT_HASH_BUCKETS,
+        )
+        steps.append(("hashing_encoder", encoder))
+    if encoder_options.get("min_frequency") or encoder_options.get("max_categories"):
+        grouper = RareCategoryGrouper(
+            min_frequency=encoder_options.get("min_frequency"),
+            max_categories=encoder_options.get("max_categories"),
+        )
+        steps.append(("rare_category_grouper", grouper))
+    return steps
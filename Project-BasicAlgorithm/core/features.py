@@ -0,0 +1,145 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import sklearn
+
+from core.cache import DEFAULT_CACHE_MAX_MB, DirectoryCache, make_cache_key
+
+ENCODED_FRAMES = ("train_x", "test_x")
+ENCODER_FILE = "encoder.joblib"
+META_FILE = "meta.json"
+
+
+def describe_params(value):
+    """
+    a stable description of encoder params for the cache key,
+    estimators by class and params, functions by name instead of address
+    """
+    if hasattr(value, "get_params"):
+        return [
+            type(value).__qualname__,
+            describe_params(value.get_params(deep=False)),
+        ]
+    if isinstance(value, dict):
+        return {str(key): describe_params(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [describe_params(item) for item in value]
+    if callable(value):
+        module = getattr(value, "__module__", "")
+        return f"{module}.{getattr(value, '__qualname__', value)}"
+    return str(value)
+
+
+def get_features_key(data_key, pipeline):
+    return make_cache_key(
+        data_key, describe_params(pipeline), sklearn_version=sklearn.__version__
+    )
+
+
+def write_matrix(path, name, matrix):
+    """
+    write an encoded matrix so that it can be memory-mapped, return its format
+    """
+    if sp.issparse(matrix):
+        matrix = matrix.tocsr()
+        for part in ("data", "indices", "indptr"):
+            np.save(os.path.join(path, f"{name}.{part}.npy"), getattr(matrix, part))
+        return dict(format="csr", shape=list(matrix.shape))
+
+    if isinstance(matrix, pd.DataFrame):
+        import pyarrow as pa
+        from pyarrow import feather
+
+        feather.write_feather(
+            pa.Table.from_pandas(matrix),
+            os.path.join(path, f"{name}.feather"),
+            compression="uncompressed",
+        )
+        return dict(format="feather")
+
+    np.save(os.path.join(path, f"{name}.npy"), np.asarray(matrix))
+    return dict(format="npy")
+
+
+def read_matrix(path, name, meta):
+    if meta["format"] == "csr":
+        data, indices, indptr = (
+            np.load(os.path.join(path, f"{name}.{part}.npy"), mmap_mode="r")
+            for part in ("data", "indices", "indptr")
+        )
+        return sp.csr_matrix(
+            (data, indices, indptr), shape=tuple(meta["shape"]), copy=False
+        )
+
+    if meta["format"] == "feather":
+        from pyarrow import feather
+
+        table = feather.read_table(
+            os.path.join(path, f"{name}.feather"), memory_map=True
+        )
+        return table.to_pandas()
+
+    return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+
+def write_features(path, pipeline, frames):
+    joblib.dump(pipeline, os.path.join(path, ENCODER_FILE))
+    meta = {
+        name: write_matrix(path, name, frame)
+        for name, frame in zip(ENCODED_FRAMES, frames)
+    }
+    with open(os.path.join(path, META_FILE), "w") as w_f:
+        json.dump(meta, w_f)
+
+
+def read_features(path):
+    with open(os.path.join(path, META_FILE), "r") as r_f:
+        meta = json.load(r_f)
+    pipeline = joblib.load(os.path.join(path, ENCODER_FILE))
+    frames = tuple(read_matrix(path, name, meta[name]) for name in ENCODED_FRAMES)
+    return (pipeline,) + frames
+
+
+def encode_with_cache(pipeline, train_x, test_x, cache_options):
+    """
+    fit the encoder pipeline and encode train_x and test_x, or load the fitted
+    encoder and the memory-mapped matrices encoded before for the same data,
+    cache_options: data_key of the data, cache_dir and cache_max_mb
+    """
+    cache = DirectoryCache(
+        cache_options.get("cache_dir"),
+        max_mb=cache_options.get("cache_max_mb", DEFAULT_CACHE_MAX_MB),
+        namespace="features",
+    )
+    key = get_features_key(cache_options["data_key"], pipeline)
+    entry_path = cache.get(key)
+    if entry_path:
+        print(f"load cached features from {entry_path}")
+        return read_features(entry_path)
+
+    train_x = pipeline.fit_transform(train_x)
+    test_x = pipeline.transform(test_x)
+    cache.put(key, lambda path: write_features(path, pipeline, (train_x, test_x)))
+    print(f"cache features to {cache.entry_path(key)}")
+    return pipeline, train_x, test_x
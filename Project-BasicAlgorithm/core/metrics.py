@@ -15,11 +15,71 @@
 # specific language governing permissions and limitations
 # under the License.
 
+import time
+
+import numpy as np
 from sklearn.metrics import classification_report
 
+# metrics per request of MlflowClient.log_batch
+LOG_BATCH_SIZE = 1000
+
 
 def eval_classification_metrics(y_true, y_pred):
     result: dict = classification_report(y_true, y_pred, output_dict=True)
     metrics = result["weighted avg"]
     metrics["accuracy"] = result["accuracy"]
     return metrics
+
+
+def eval_confusion_metrics(confusion):
+    """
+    the metrics of eval_classification_metrics from a confusion matrix
+    accumulated chunk by chunk, rows are true labels and columns predictions
+    """
+    confusion = np.asarray(confusion, dtype=np.float64)
+    true_positive = np.diag(confusion)
+    support = confusion.sum(axis=1)
+    predicted = confusion.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.nan_to_num(true_positive / predicted)
+        recall = np.nan_to_num(true_positive / support)
+        f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+
+    total = support.sum()
+    weights = support / total if total else support
+    return {
+        "precision": float(np.dot(weights, precision)),
+        "recall": float(np.dot(weights, recall)),
+        "f1-score": float(np.dot(weights, f1)),
+        "support": float(total),
+        "accuracy": float(true_positive.sum() / total) if total else 0.0,
+    }
+
+
+def log_learning_curve(best_iteration, evals_result, prefix="valid"):
+    """
+    log the best iteration and the validation curves of a boosting model
+    to the active run, the boosting round is the step of every point
+    """
+    import mlflow
+    from mlflow.entities import Metric
+    from mlflow.tracking import MlflowClient
+
+    run = mlflow.active_run()
+    if run is None:
+        return
+
+    timestamp = int(time.time() * 1000)
+    metrics = [Metric("best_iteration", best_iteration, timestamp, 0)]
+    for curves in evals_result.values():
+        for name, values in curves.items():
+            metrics.extend(
+                Metric(f"{prefix}.{name}", value, timestamp, step)
+                for step, value in enumerate(values)
+            )
+
+    client = MlflowClient()
+    for start in range(0, len(metrics), LOG_BATCH_SIZE):
+        client.log_batch(
+            run.info.run_id, metrics=metrics[start : start + LOG_BATCH_SIZE]
+        )
@@ -0,0 +1,155 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import json
+import os
+import tempfile
+from functools import partial
+
+import joblib
+import mlflow
+import numpy as np
+
+MODEL_FORMATS = ("pickle", "native")
+# algorithms whose booster is saved in its own format by the native format
+NATIVE_ALGORITHMS = ("lightgbm", "xgboost")
+ARTIFACT_PATHS = {"pickle": "sklearn_model", "native": "native_model"}
+
+BOOSTER_FILES = {"lightgbm": "booster.txt", "xgboost": "booster.ubj"}
+ENCODER_FILE = "encoder.joblib"
+META_FILE = "meta.json"
+
+
+def resolve_model_format(algorithm, model_format="pickle"):
+    """
+    the native format only applies to boosters, other models are pickled
+    """
+    if model_format not in MODEL_FORMATS:
+        raise ValueError(f"model_format {model_format} must be one of {MODEL_FORMATS}")
+    if model_format == "native" and algorithm not in NATIVE_ALGORITHMS:
+        print(f"{algorithm} has no native format, the model is pickled")
+        return "pickle"
+    return model_format
+
+
+def get_save_func(model, model_format="pickle", code_paths=None):
+    """
+    save_func(path) of the model in model_format, see core.upload.ArtifactUpload
+    """
+    if model_format == "native":
+        return partial(save_native_model, model, code_paths=code_paths)
+    return partial(mlflow.sklearn.save_model, model, code_paths=code_paths)
+
+
+def save_booster(model, path):
+    """
+    save the booster of a fitted classifier in its own format,
+    return the booster type and what predict needs besides the trees
+    """
+    classes = np.asarray(model.classes_).tolist()
+    if hasattr(model, "booster_"):
+        # the best iteration of early stopping is saved by default
+        model.booster_.save_model(os.path.join(path, BOOSTER_FILES["lightgbm"]))
+        return dict(booster="lightgbm", classes=classes)
+
+    model.get_booster().save_model(os.path.join(path, BOOSTER_FILES["xgboost"]))
+    best_iteration = getattr(model, "best_iteration", None)
+    return dict(
+        booster="xgboost",
+        classes=classes,
+        best_iteration=best_iteration,
+        enable_categorical=bool(model.get_params().get("enable_categorical")),
+    )
+
+
+def save_native_model(pipeline, path, code_paths=None):
+    """
+    save a fitted pipeline of encoders and a LightGBM or XGBoost classifier as
+    a pyfunc model, the encoders compressed by joblib and the booster as
+    LightGBM text or XGBoost UBJSON
+    """
+    model = pipeline.steps[-1][1]
+    with tempfile.TemporaryDirectory(prefix="native-") as tmp_dir:
+        meta = save_booster(model, tmp_dir)
+        joblib.dump(pipeline[:-1], os.path.join(tmp_dir, ENCODER_FILE), compress=3)
+        with open(os.path.join(tmp_dir, META_FILE), "w") as w_f:
+            json.dump(meta, w_f)
+
+        artifacts = {
+            "booster": os.path.join(tmp_dir, BOOSTER_FILES[meta["booster"]]),
+            "encoder": os.path.join(tmp_dir, ENCODER_FILE),
+            "meta": os.path.join(tmp_dir, META_FILE),
+        }
+        mlflow.pyfunc.save_model(
+            path,
+            python_model=NativeBoosterModel(),
+            artifacts=artifacts,
+            code_paths=code_paths,
+        )
+
+
+class NativeBoosterModel(mlflow.pyfunc.PythonModel):
+    """
+    pyfunc model of an encoder pipeline and a native booster,
+    both are only loaded by the first predict
+    """
+
+    def load_context(self, context):
+        self.artifacts = context.artifacts
+        self.encoder = None
+        self.booster = None
+
+    def load(self):
+        with open(self.artifacts["meta"], "r") as r_f:
+            self.meta = json.load(r_f)
+        self.classes = np.asarray(self.meta["classes"])
+        self.encoder = joblib.load(self.artifacts["encoder"])
+
+        if self.meta["booster"] == "lightgbm":
+            import lightgbm
+
+            self.booster = lightgbm.Booster(model_file=self.artifacts["booster"])
+        else:
+            import xgboost
+
+            self.booster = xgboost.Booster()
+            self.booster.load_model(self.artifacts["booster"])
+
+    def predict_proba(self, model_input):
+        if self.booster is None:
+            self.load()
+        features = self.encoder.transform(model_input)
+
+        if self.meta["booster"] == "lightgbm":
+            return self.booster.predict(features)
+
+        import xgboost
+
+        dmatrix = xgboost.DMatrix(
+            features, enable_categorical=self.meta["enable_categorical"]
+        )
+        best_iteration = self.meta["best_iteration"]
+        if best_iteration is None:
+            return self.booster.predict(dmatrix)
+        return self.booster.predict(dmatrix, iteration_range=(0, best_iteration + 1))
+
+    def predict(self, context, model_input, params=None):
+        proba = self.predict_proba(model_input)
+        if proba.ndim == 1:
+            # binary objectives predict the probability of the second class
+            return self.classes[(proba > 0.5).astype(int)]
+        return self.classes[np.argmax(proba, axis=1)]
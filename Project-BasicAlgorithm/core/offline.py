@@ -0,0 +1,232 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import mlflow
+from mlflow.entities import Metric, Param, RunTag, ViewType
+from mlflow.tracking import MlflowClient
+from mlflow.utils.file_utils import local_file_uri_to_path
+from mlflow.utils.mlflow_tags import MLFLOW_PARENT_RUN_ID
+
+from core.registry import list_experiment_ids
+
+# entities per log_batch request, the limits of the tracking server
+SYNC_MAX_METRICS = 1000
+SYNC_MAX_PARAMS = 100
+SYNC_MAX_TAGS = 100
+# batches and artifact files sent in parallel
+SYNC_WORKERS = 4
+
+# tags of offline runs, not synced to the tracking server
+SYNC_TAG_PREFIX = "sync."
+# the run and experiment of the tracking server the offline run is synced to
+TARGET_RUN_TAG = "sync.target_run_id"
+TARGET_EXPERIMENT_TAG = "sync.target_experiment_id"
+# set on the offline run once synced
+SYNCED_RUN_TAG = "sync.synced_run_id"
+
+# environment of mlflow run pointing to the run of the tracking server
+TRACKING_ENV = ("MLFLOW_TRACKING_URI", "MLFLOW_RUN_ID", "MLFLOW_EXPERIMENT_ID")
+
+
+def get_local_uri(offline_dir):
+    return f"file:{os.path.abspath(offline_dir)}"
+
+
+@contextmanager
+def offline_tracking(offline_dir):
+    """
+    log to the file store in offline_dir instead of the tracking server,
+    worker processes as well, yield the tags that record where the offline
+    runs are synced to, the tracking server is restored on exit
+    """
+    remote_uri = mlflow.get_tracking_uri()
+    saved_env = {key: os.environ.get(key) for key in TRACKING_ENV}
+    sync_tags = {}
+    if saved_env["MLFLOW_RUN_ID"]:
+        sync_tags[TARGET_RUN_TAG] = saved_env["MLFLOW_RUN_ID"]
+    if saved_env["MLFLOW_EXPERIMENT_ID"]:
+        sync_tags[TARGET_EXPERIMENT_TAG] = saved_env["MLFLOW_EXPERIMENT_ID"]
+
+    local_uri = get_local_uri(offline_dir)
+    os.environ.pop("MLFLOW_RUN_ID", None)
+    os.environ.pop("MLFLOW_EXPERIMENT_ID", None)
+    os.environ["MLFLOW_TRACKING_URI"] = local_uri
+    mlflow.set_tracking_uri(local_uri)
+    try:
+        yield sync_tags
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        mlflow.set_tracking_uri(remote_uri)
+
+
+def chunks(items, size):
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def get_remote_experiment_id(local, remote, run):
+    """
+    the target experiment of the run, or the experiment of the same name
+    """
+    experiment_id = run.data.tags.get(TARGET_EXPERIMENT_TAG)
+    if experiment_id:
+        return experiment_id
+
+    name = local.get_experiment(run.info.experiment_id).name
+    experiment = remote.get_experiment_by_name(name)
+    if experiment is not None:
+        return experiment.experiment_id
+    return remote.create_experiment(name)
+
+
+def sync_artifacts(local, remote, local_run_id, remote_run_id, executor):
+    """
+    upload every artifact file of the offline run, one request per file
+    """
+    artifact_dir = local_file_uri_to_path(local.get_run(local_run_id).info.artifact_uri)
+    if not os.path.isdir(artifact_dir):
+        return []
+
+    files = []
+    for root, _, names in os.walk(artifact_dir):
+        artifact_path = os.path.relpath(root, artifact_dir)
+        for name in names:
+            files.append(
+                (
+                    os.path.join(root, name),
+                    None if artifact_path == "." else artifact_path,
+                )
+            )
+    return [
+        executor.submit(remote.log_artifact, remote_run_id, path, artifact_path)
+        for path, artifact_path in files
+    ]
+
+
+def sync_run(local, remote, run, remote_run_id=None, parent_run_id=None):
+    """
+    copy the params, metric history, tags and artifacts of an offline run to
+    remote_run_id, or to a new run of the tracking server
+    """
+    run_id = run.info.run_id
+    remote_run_id = remote_run_id or run.data.tags.get(TARGET_RUN_TAG)
+    tags = {
+        key: value
+        for key, value in run.data.tags.items()
+        if not key.startswith(SYNC_TAG_PREFIX) and key != MLFLOW_PARENT_RUN_ID
+    }
+    if parent_run_id:
+        tags[MLFLOW_PARENT_RUN_ID] = parent_run_id
+
+    if not remote_run_id:
+        remote_run = remote.create_run(
+            get_remote_experiment_id(local, remote, run),
+            start_time=run.info.start_time,
+        )
+        remote_run_id = remote_run.info.run_id
+
+    metrics = [
+        metric
+        for key in run.data.metrics
+        for metric in local.get_metric_history(run_id, key)
+    ]
+    params = [Param(key, value) for key, value in run.data.params.items()]
+    tags = [RunTag(key, value) for key, value in tags.items()]
+
+    with ThreadPoolExecutor(max_workers=SYNC_WORKERS) as executor:
+        futures = [
+            executor.submit(remote.log_batch, remote_run_id, params=batch)
+            for batch in chunks(params, SYNC_MAX_PARAMS)
+        ]
+        futures += [
+            executor.submit(remote.log_batch, remote_run_id, tags=batch)
+            for batch in chunks(tags, SYNC_MAX_TAGS)
+        ]
+        futures += [
+            executor.submit(
+                remote.log_batch,
+                remote_run_id,
+                metrics=[
+                    Metric(metric.key, metric.value, metric.timestamp, metric.step)
+                    for metric in batch
+                ],
+            )
+            for batch in chunks(metrics, SYNC_MAX_METRICS)
+        ]
+        futures += sync_artifacts(local, remote, run_id, remote_run_id, executor)
+        for future in futures:
+            future.result()
+
+    if run.info.status != "RUNNING":
+        remote.set_terminated(
+            remote_run_id, status=run.info.status, end_time=run.info.end_time
+        )
+    local.set_tag(run_id, SYNCED_RUN_TAG, remote_run_id)
+    print(f"sync run {run_id} to {remote_run_id}")
+    return remote_run_id
+
+
+def sync_runs(offline_dir, remote_uri=None, run_ids=None):
+    """
+    sync the runs of offline_dir not synced yet, all of them without run_ids,
+    parents before children whose parent tag points to the synced parent.
+    Return {offline run id: run id of the tracking server}
+    """
+    local = MlflowClient(get_local_uri(offline_dir))
+    remote = MlflowClient(remote_uri or mlflow.get_tracking_uri())
+
+    experiment_ids = list_experiment_ids(local)
+    runs = []
+    page_token = None
+    while True:
+        page = local.search_runs(
+            experiment_ids, run_view_type=ViewType.ALL, page_token=page_token
+        )
+        runs.extend(page)
+        page_token = page.token
+        if not page_token:
+            break
+    if run_ids is not None:
+        run_ids = set(run_ids)
+        runs = [
+            run
+            for run in runs
+            if run.info.run_id in run_ids
+            or run.data.tags.get(MLFLOW_PARENT_RUN_ID) in run_ids
+        ]
+
+    synced = {
+        run.info.run_id: run.data.tags[SYNCED_RUN_TAG]
+        for run in runs
+        if SYNCED_RUN_TAG in run.data.tags
+    }
+    pending = [run for run in runs if run.info.run_id not in synced]
+    # parents first so that children point to the synced parent
+    pending.sort(key=lambda run: MLFLOW_PARENT_RUN_ID in run.data.tags)
+    for run in pending:
+        parent_run_id = run.data.tags.get(MLFLOW_PARENT_RUN_ID)
+        synced[run.info.run_id] = sync_run(
+            local, remote, run, parent_run_id=synced.get(parent_run_id)
+        )
+    return synced
@@ -0,0 +1,137 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def current_rss_mb():
+    """
+    resident memory of this process, None if /proc is not available
+    """
+    try:
+        with open("/proc/self/statm", "r") as r_f:
+            resident_pages = int(r_f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / MB
+
+
+def max_rss_mb():
+    """
+    peak resident memory of this process since it started
+    """
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on linux
+    if sys.platform == "darwin":
+        return max_rss / MB
+    return max_rss / 1024
+
+
+class MemorySampler(threading.Thread):
+    """
+    sample resident memory in background and keep the peak
+    """
+
+    def __init__(self, interval=0.1):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_mb = current_rss_mb() or 0.0
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, current_rss_mb() or 0.0)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        return max(self.peak_mb, current_rss_mb() or 0.0)
+
+
+class StageProfiler:
+    """
+    wall time of every stage, and peak resident memory with sample_memory
+    """
+
+    def __init__(self, sample_memory=False, interval=0.1):
+        self.sample_memory = sample_memory
+        self.interval = interval
+        self.timings = {}
+        self.peak_memory = {}
+
+    @contextmanager
+    def stage(self, name):
+        sampler = None
+        if self.sample_memory:
+            sampler = MemorySampler(self.interval)
+            sampler.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+            if sampler:
+                peak_mb = sampler.stop()
+                self.peak_memory[name] = max(self.peak_memory.get(name, 0), peak_mb)
+
+    def record(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def metrics(self):
+        metrics = {f"time.{name}_s": value for name, value in self.timings.items()}
+        for name, value in self.peak_memory.items():
+            metrics[f"mem.{name}.peak_mb"] = value
+        metrics["mem.peak_mb"] = max_rss_mb()
+        return metrics
+
+    def log(self, run_id):
+        """
+        log all stage metrics to the run with one request and as a json log line
+        """
+        from mlflow.entities import Metric
+        from mlflow.tracking import MlflowClient
+
+        metrics = self.metrics()
+        timestamp = int(time.time() * 1000)
+        MlflowClient().log_batch(
+            run_id,
+            metrics=[
+                Metric(key, value, timestamp, 0) for key, value in metrics.items()
+            ],
+        )
+        logger.info("stage metrics: %s", json.dumps(metrics, sort_keys=True))
+        return metrics
+
+    def reset(self):
+        self.timings.clear()
+        self.peak_memory.clear()
+
+
+# shared by train.py and the training functions
+profiler = StageProfiler()
+stage = profiler.stage
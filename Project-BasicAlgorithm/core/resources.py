@@ -0,0 +1,138 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import math
+import os
+from contextlib import contextmanager
+from functools import reduce
+
+from core.search import DEFAULT_SEARCH_BUDGET, SEARCH_CV
+
+# parameters that set the threads of a model, the first one found is used
+THREAD_PARAMS = ("n_jobs", "num_threads", "nthread", "thread_count")
+
+
+def read_cgroup_quota():
+    """
+    cpu quota of the container as a number of cores, None without quota
+    """
+    # cgroup v2
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r") as r_f:
+            quota, period = r_f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v1
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", "r") as r_f:
+            quota = int(r_f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", "r") as r_f:
+            period = int(r_f.read())
+    except (OSError, ValueError):
+        return None
+    if quota <= 0 or period <= 0:
+        return None
+    return quota / period
+
+
+def available_cores():
+    """
+    cores this process may use, bounded by cpu affinity and cgroup quota
+    """
+    if hasattr(os, "sched_getaffinity"):
+        n_cores = len(os.sched_getaffinity(0))
+    else:
+        n_cores = os.cpu_count() or 1
+
+    quota = read_cgroup_quota()
+    if quota:
+        n_cores = min(n_cores, max(int(math.floor(quota)), 1))
+    return n_cores
+
+
+def count_search_fits(search_params, search_strategy="grid", search_budget=None):
+    """
+    number of fits that may run at the same time in the first search round
+    """
+    if not search_params:
+        return 1
+    if search_strategy == "bayes":
+        # trials are sampled one after another
+        return 1
+    if search_strategy in ("grid", "halving-grid"):
+        n_candidates = reduce(
+            lambda count, values: count * max(len(values), 1),
+            search_params.values(),
+            1,
+        )
+    else:
+        n_candidates = search_budget or DEFAULT_SEARCH_BUDGET
+    return n_candidates * SEARCH_CV
+
+
+def plan_threads(n_cores, n_fits=1):
+    """
+    split n_cores into search jobs running fits in parallel and threads of
+    every model, search jobs first since fits scale better than model threads
+    """
+    n_cores = max(int(n_cores), 1)
+    search_jobs = max(min(n_cores, n_fits), 1)
+    model_threads = max(n_cores // search_jobs, 1)
+    return dict(n_cores=n_cores, search_jobs=search_jobs, model_threads=model_threads)
+
+
+def set_model_threads(model_cls, input_params, model_threads):
+    """
+    set the thread parameter of the model unless it is given in params
+    """
+    if any(key in input_params for key in THREAD_PARAMS):
+        return input_params
+
+    default_params = model_cls().get_params()
+    for key in THREAD_PARAMS:
+        if key in default_params:
+            input_params[key] = model_threads
+            break
+    return input_params
+
+
+@contextmanager
+def limit_blas_threads(n_threads):
+    """
+    limit OpenBLAS/MKL/OpenMP threads of this process, no-op without threadpoolctl
+    """
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        yield
+        return
+
+    with threadpool_limits(limits=n_threads):
+        yield
+
+
+def log_thread_plan(plan):
+    print(f"thread plan: {plan}")
+
+    import mlflow
+
+    if mlflow.active_run() is not None:
+        mlflow.log_params({f"resources.{key}": value for key, value in plan.items()})
@@ -0,0 +1,288 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import time
+import warnings
+
+import numpy as np
+from sklearn.base import clone, is_classifier
+from sklearn.model_selection import GridSearchCV, RandomizedSearchCV, check_cv
+
+SEARCH_STRATEGIES = ("grid", "random", "halving-grid", "halving-random", "bayes")
+# candidates sampled by the random and bayes strategies without search_budget
+DEFAULT_SEARCH_BUDGET = 10
+SEARCH_CV = 5
+
+
+def get_search_cv(
+    model,
+    search_params,
+    search_strategy="grid",
+    search_budget=None,
+    search_resource="n_samples",
+    random_state=None,
+    search_storage=None,
+    search_study=None,
+    n_jobs=None,
+):
+    """
+    build the search over search_params,
+    search_budget is the number of candidates sampled by random strategies,
+    halving strategies fit all candidates on a small amount of search_resource
+    and only keep the best 1/3 for the next round with 3 times more resource,
+    bayes strategy samples candidates by TPE and keeps its study in search_storage,
+    n_jobs fits run in parallel except for the sequential bayes strategy
+    """
+    if search_strategy not in SEARCH_STRATEGIES:
+        raise ValueError(
+            f"search_strategy {search_strategy} not supported, "
+            f"must be one of {SEARCH_STRATEGIES}"
+        )
+
+    if search_budget and search_strategy in ("grid", "halving-grid"):
+        warnings.warn(f"search_budget is ignored by {search_strategy} search")
+
+    if search_strategy == "grid":
+        return GridSearchCV(estimator=model, param_grid=search_params, n_jobs=n_jobs)
+
+    if search_strategy == "bayes":
+        return BayesSearchCV(
+            estimator=model,
+            param_distributions=search_params,
+            n_trials=search_budget or DEFAULT_SEARCH_BUDGET,
+            random_state=random_state,
+            storage=search_storage,
+            study_name=search_study,
+        )
+
+    if search_strategy == "random":
+        return RandomizedSearchCV(
+            estimator=model,
+            param_distributions=search_params,
+            n_iter=search_budget or DEFAULT_SEARCH_BUDGET,
+            random_state=random_state,
+            n_jobs=n_jobs,
+        )
+
+    # halving search is experimental in scikit-learn
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import HalvingGridSearchCV, HalvingRandomSearchCV
+
+    halving_options = dict(
+        resource=search_resource,
+        random_state=random_state,
+        n_jobs=n_jobs,
+        **get_max_resources(model, search_params, search_resource),
+    )
+    if search_strategy == "halving-grid":
+        return HalvingGridSearchCV(
+            estimator=model, param_grid=search_params, **halving_options
+        )
+
+    # the last round should fit the survivors on all resource,
+    # unless the number of candidates is derived from the resource
+    n_candidates = search_budget or "exhaust"
+    return HalvingRandomSearchCV(
+        estimator=model,
+        param_distributions=search_params,
+        n_candidates=n_candidates,
+        min_resources="smallest" if n_candidates == "exhaust" else "exhaust",
+        **halving_options,
+    )
+
+
+def get_max_resources(model, search_params, search_resource):
+    """
+    a model parameter such as n_estimators as resource is bounded by its value
+    """
+    if search_resource == "n_samples":
+        return {}
+
+    model_params = model.get_params()
+    if search_resource not in model_params:
+        raise ValueError(f"search_resource {search_resource} is not a model parameter")
+    if search_resource in search_params:
+        raise ValueError(f"search_resource {search_resource} can not be searched")
+
+    max_resources = model_params[search_resource]
+    if not isinstance(max_resources, int):
+        raise ValueError(
+            f"search_resource {search_resource} must be an integer parameter, "
+            f"set it with --params"
+        )
+    return dict(max_resources=max_resources)
+
+
+def print_search_results(search_cv):
+    """
+    print every candidate with its mean test score,
+    halving search also prints the round and the resource of the candidate
+    """
+    cv_results = search_cv.cv_results_
+    params = cv_results["params"]
+    mean_test_score = cv_results["mean_test_score"]
+    if "n_resources" not in cv_results:
+        for param, score in zip(params, mean_test_score):
+            print(param, score)
+        return
+
+    for param, score, n_iter, n_resources in zip(
+        params, mean_test_score, cv_results["iter"], cv_results["n_resources"]
+    ):
+        print(f"iter {n_iter} n_resources {n_resources}", param, score)
+
+
+class BayesSearchCV:
+    """
+    sequential model-based search with optuna,
+    the mean score of the folds seen so far is reported after every fold
+    so that trials worse than the median of previous trials are pruned,
+    the study is saved in storage and resumed by study_name after a restart
+    """
+
+    def __init__(
+        self,
+        estimator,
+        param_distributions,
+        n_trials=DEFAULT_SEARCH_BUDGET,
+        cv=SEARCH_CV,
+        random_state=None,
+        storage=None,
+        study_name=None,
+    ):
+        self.estimator = estimator
+        self.param_distributions = param_distributions
+        self.n_trials = n_trials
+        self.cv = cv
+        self.random_state = random_state
+        self.storage = storage
+        self.study_name = study_name
+
+    def create_study(self):
+        import optuna
+
+        storage = self.storage
+        if storage and "://" not in storage:
+            os.makedirs(os.path.dirname(os.path.abspath(storage)), exist_ok=True)
+            storage = f"sqlite:///{os.path.abspath(storage)}"
+
+        return optuna.create_study(
+            study_name=self.study_name,
+            storage=storage,
+            load_if_exists=True,
+            direction="maximize",
+            sampler=optuna.samplers.TPESampler(seed=self.random_state),
+            pruner=optuna.pruners.MedianPruner(n_warmup_steps=1),
+        )
+
+    def suggest_params(self, trial):
+        params = {}
+        for key, values in self.param_distributions.items():
+            if is_primitive(values):
+                params[key] = trial.suggest_categorical(key, values)
+            else:
+                # optuna only stores primitive choices, suggest the index instead
+                index = trial.suggest_categorical(key, list(range(len(values))))
+                params[key] = values[index]
+        return params
+
+    def objective(self, trial, X, y, **fit_params):
+        import optuna
+
+        params = self.suggest_params(trial)
+        cv = check_cv(self.cv, y, classifier=is_classifier(self.estimator))
+        scores = []
+        for step, (train_index, test_index) in enumerate(cv.split(X, y)):
+            model = clone(self.estimator).set_params(**params)
+            model.fit(
+                take_rows(X, train_index), take_rows(y, train_index), **fit_params
+            )
+            score = model.score(take_rows(X, test_index), take_rows(y, test_index))
+            scores.append(score)
+            trial.report(float(np.mean(scores)), step)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+        return float(np.mean(scores))
+
+    def fit(self, X, y, **fit_params):
+        import optuna
+
+        study = self.create_study()
+        finished_states = (
+            optuna.trial.TrialState.COMPLETE,
+            optuna.trial.TrialState.PRUNED,
+        )
+        n_finished = len(study.get_trials(deepcopy=False, states=finished_states))
+        if n_finished:
+            print(f"resume study {study.study_name} after {n_finished} trials")
+
+        study.optimize(
+            lambda trial: self.objective(trial, X, y, **fit_params),
+            n_trials=max(self.n_trials - n_finished, 0),
+            callbacks=[log_trial],
+        )
+
+        trials = study.get_trials(states=(optuna.trial.TrialState.COMPLETE,))
+        if not trials:
+            raise ValueError("bayes search has no complete trial")
+        self.study_ = study
+        self.cv_results_ = {
+            "params": [self.trial_params(trial) for trial in trials],
+            "mean_test_score": np.array([trial.value for trial in trials]),
+        }
+        self.best_params_ = self.trial_params(study.best_trial)
+        self.best_score_ = study.best_value
+
+        start = time.perf_counter()
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_)
+        self.best_estimator_.fit(X, y, **fit_params)
+        self.refit_time_ = time.perf_counter() - start
+        return self
+
+    def trial_params(self, trial):
+        params = {}
+        for key, value in trial.params.items():
+            values = self.param_distributions[key]
+            params[key] = value if is_primitive(values) else values[value]
+        return params
+
+
+def is_primitive(values):
+    return all(isinstance(value, (bool, int, float, str)) for value in values)
+
+
+def take_rows(data, index):
+    if hasattr(data, "iloc"):
+        return data.iloc[index]
+    return data[index]
+
+
+def log_trial(study, trial):
+    """
+    log the score of every finished trial to the active run with the trial as step
+    """
+    import mlflow
+    import optuna
+
+    if mlflow.active_run() is None:
+        return
+    if trial.state == optuna.trial.TrialState.COMPLETE:
+        mlflow.log_metric("search.trial_score", trial.value, step=trial.number)
+        mlflow.log_metric("search.best_score", study.best_value, step=trial.number)
+    elif trial.state == optuna.trial.TrialState.PRUNED:
+        mlflow.log_metric("search.pruned_trial", trial.number, step=trial.number)
@@ -0,0 +1,190 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from core.cache import file_fingerprint, make_cache_key
+from core.files import get_dataset_source, list_shards
+
+SPLIT_MODES = ("memory", "hash")
+SPLIT_CHUNK_ROWS = 500000
+
+
+def hash_uniform(values, random_state=1):
+    """
+    map values to [0, 1) with a hash seeded by random_state
+    """
+    hash_key = str(random_state).zfill(16)[-16:]
+    hashed = pd.util.hash_pandas_object(
+        pd.Series(values), index=False, hash_key=hash_key
+    ).to_numpy()
+    # hash_key only applies to object values, numbers are seeded by rehashing
+    seed = pd.util.hash_array(np.array([hash_key], dtype=object), hash_key=hash_key)
+    hashed = pd.util.hash_array(hashed ^ seed[0])
+    return hashed / float(2**64)
+
+
+def assign_test_rows(uniform, labels=None, test_size=0.25, label_counts=None):
+    """
+    rows with small hash values go to the test set,
+    with labels the test rows are chosen per label so that every label keeps
+    test_size of its rows seen so far, label_counts carries (seen, test) counts
+    between chunks
+    """
+    if labels is None:
+        return uniform < test_size
+
+    is_test = np.zeros(len(uniform), dtype=bool)
+    frame = pd.DataFrame({"uniform": uniform, "label": np.asarray(labels)})
+    for label, group in frame.groupby("label", sort=False, dropna=False):
+        seen, n_test = label_counts.get(label, (0, 0))
+        seen += len(group)
+        n_chunk_test = min(max(int(round(test_size * seen)) - n_test, 0), len(group))
+        if n_chunk_test:
+            is_test[group["uniform"].nsmallest(n_chunk_test).index] = True
+        label_counts[label] = (seen, n_test + n_chunk_test)
+    return is_test
+
+
+def iter_chunks(data_path, data_format, columns=None, chunk_rows=SPLIT_CHUNK_ROWS):
+    """
+    yield pandas chunks for csv and arrow record batches for parquet/feather
+    """
+    if data_format == "csv":
+        for shard in list_shards(data_path):
+            yield from pd.read_csv(shard, usecols=columns, chunksize=chunk_rows)
+    else:
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(
+            get_dataset_source(data_path), format=data_format, partitioning="hive"
+        )
+        yield from dataset.to_batches(columns=columns, batch_size=chunk_rows)
+
+
+def write_hash_split(
+    data_path,
+    data_format,
+    output_dir,
+    label_column,
+    test_size=0.25,
+    random_state=1,
+    split_key=None,
+    stratify=False,
+    columns=None,
+):
+    """
+    stream the data once and append every chunk to train and test files
+    """
+    suffix = ".csv" if data_format == "csv" else ".parquet"
+    train_path = os.path.join(output_dir, f"train{suffix}")
+    test_path = os.path.join(output_dir, f"test{suffix}")
+
+    label_counts = {}
+    writers = []
+    offset = 0
+    for chunk in iter_chunks(data_path, data_format, columns=columns):
+        num_rows = len(chunk) if data_format == "csv" else chunk.num_rows
+        if split_key:
+            values = get_column(chunk, split_key)
+        else:
+            values = np.arange(offset, offset + num_rows, dtype=np.int64)
+
+        labels = get_column(chunk, label_column) if stratify else None
+        is_test = assign_test_rows(
+            hash_uniform(values, random_state), labels, test_size, label_counts
+        )
+
+        if data_format == "csv":
+            header = offset == 0
+            chunk[~is_test].to_csv(train_path, mode="a", header=header, index=False)
+            chunk[is_test].to_csv(test_path, mode="a", header=header, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if not writers:
+                writers.append(pq.ParquetWriter(train_path, chunk.schema))
+                writers.append(pq.ParquetWriter(test_path, chunk.schema))
+            for writer, mask in zip(writers, (~is_test, is_test)):
+                table = pa.Table.from_batches([chunk.filter(pa.array(mask))])
+                writer.write_table(table)
+        offset += num_rows
+
+    for writer in writers:
+        writer.close()
+
+    print(f"hash split {offset} rows to {output_dir}")
+    return train_path, test_path
+
+
+def get_column(chunk, column):
+    if isinstance(chunk, pd.DataFrame):
+        return chunk[column].to_numpy()
+    return chunk.column(column).to_pandas().to_numpy()
+
+
+def hash_split_data(
+    data_path,
+    data_format,
+    label_column,
+    test_size=0.25,
+    random_state=1,
+    split_key=None,
+    stratify=False,
+    columns=None,
+    cache=None,
+    output_dir=None,
+):
+    """
+    out-of-core train/test split, a row goes to the test set by the hash of
+    split_key column (or row number) seeded by random_state, so the split is
+    reproducible across reruns. The partitions are written to the cache,
+    or to output_dir without cache, which the caller removes when done.
+    """
+    options = dict(
+        label_column=label_column,
+        test_size=test_size,
+        random_state=random_state,
+        split_key=split_key,
+        stratify=stratify,
+        columns=columns,
+    )
+
+    def write_func(output_dir):
+        return write_hash_split(data_path, data_format, output_dir, **options)
+
+    if cache is None:
+        if output_dir is None:
+            raise ValueError("hash split needs a cache or an output_dir")
+        return write_func(output_dir)
+
+    key = make_cache_key(file_fingerprint(data_path), **options)
+    output_dir = cache.get(key)
+    if output_dir:
+        print(f"load hash split from {output_dir}")
+    else:
+        output_dir = cache.put(key, write_func)
+
+    suffix = ".csv" if data_format == "csv" else ".parquet"
+    return (
+        os.path.join(output_dir, f"train{suffix}"),
+        os.path.join(output_dir, f"test{suffix}"),
+    )
@@ -0,0 +1,197 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import tempfile
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from core.data import read_cached_frames, write_cached_frames
+from core.native_model import ARTIFACT_PATHS, get_save_func, resolve_model_format
+from core.profiling import profiler, stage
+from core.training import ALGORITHMS
+from core.upload import ArtifactUpload
+
+# algorithms of --algorithm all
+ALL_ALGORITHMS = ("lr", "svm", "lightgbm", "xgboost")
+
+
+def parse_algorithms(algorithm):
+    """
+    comma separated algorithms or all
+    """
+    if algorithm.strip() == "all":
+        return list(ALL_ALGORITHMS)
+    algorithms = [name.strip() for name in algorithm.split(",") if name.strip()]
+    unknown = [name for name in algorithms if name not in ALGORITHMS]
+    if not algorithms or unknown:
+        raise ValueError(
+            f"algorithm {algorithm} not supported, must be all or one of {ALGORITHMS}"
+        )
+    return algorithms
+
+
+def select_algorithm_params(param_str, algorithm):
+    """
+    params of one algorithm from the params of a tournament,
+    name=value applies to every algorithm, algorithm.name=value only to algorithm
+    """
+    if not param_str:
+        return param_str
+
+    selected = []
+    for pair in param_str.split(";"):
+        name = pair.split("=")[0].strip()
+        if "." in name:
+            prefix, _, pair = pair.strip().partition(".")
+            if prefix != algorithm:
+                continue
+        selected.append(pair)
+    return ";".join(selected)
+
+
+def select_best_algorithm(results, key_metrics="f1-score"):
+    """
+    algorithm of {algorithm: (run_id, metrics)} with the highest key_metrics
+    """
+    return max(results, key=lambda name: results[name][1][key_metrics])
+
+
+def train_algorithm(
+    algorithm,
+    frames_dir,
+    run_id,
+    train_options,
+    model_format="pickle",
+    code_paths=None,
+):
+    """
+    train one algorithm in a worker process and log it to its child run,
+    the data is read from the memory-mapped feather files of the parent,
+    numeric columns are shared by the workers rather than copied into each
+    """
+    import mlflow
+
+    from core.training import get_training_func
+
+    profiler.reset()
+    with stage("load"):
+        train_x, train_y, test_x, test_y = read_cached_frames(frames_dir, shared=True)
+
+    with mlflow.start_run(run_id=run_id):
+        training_func = get_training_func(algorithm)
+        model, metrics = training_func(
+            train_x, train_y, test_x, test_y, **train_options
+        )
+        mlflow.log_param("algorithm", algorithm)
+        mlflow.log_metrics(metrics)
+        with stage("log_model"):
+            model_format = resolve_model_format(algorithm, model_format)
+            ArtifactUpload(
+                run_id,
+                ARTIFACT_PATHS[model_format],
+                get_save_func(model, model_format, code_paths=code_paths),
+            ).wait()
+        profiler.log(run_id)
+    return metrics
+
+
+def run_tournament(
+    algorithms,
+    frames,
+    train_options,
+    n_cores,
+    key_metrics="f1-score",
+    model_format="pickle",
+    code_paths=None,
+):
+    """
+    train algorithms on the same data in parallel processes, each one logged to
+    a child run of the active run, the cores are split between the processes.
+    Return {algorithm: (run_id, metrics)} of the algorithms trained and the best.
+    """
+    import mlflow
+    from mlflow.tracking import MlflowClient
+    from mlflow.utils.mlflow_tags import MLFLOW_PARENT_RUN_ID, MLFLOW_RUN_NAME
+
+    unknown = [name for name in algorithms if name not in ALL_ALGORITHMS]
+    if unknown:
+        # fail before any run is created or process spawned
+        raise ValueError(
+            f"{unknown} can not be trained in a tournament, "
+            f"must be some of {ALL_ALGORITHMS}"
+        )
+
+    parent_run = mlflow.active_run()
+    client = MlflowClient()
+    n_workers = max(min(len(algorithms), n_cores), 1)
+    worker_cores = max(n_cores // n_workers, 1)
+    print(f"train {algorithms} with {n_workers} processes of {worker_cores} cores")
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="tournament-") as frames_dir:
+        # uncompressed feather files are memory-mapped by every worker
+        write_cached_frames(frames_dir, frames)
+
+        run_ids = {}
+        for algorithm in algorithms:
+            run = client.create_run(
+                parent_run.info.experiment_id,
+                tags={
+                    MLFLOW_PARENT_RUN_ID: parent_run.info.run_id,
+                    MLFLOW_RUN_NAME: algorithm,
+                },
+            )
+            run_ids[algorithm] = run.info.run_id
+
+        # spawn so that workers do not inherit the OpenMP state of the parent
+        with ProcessPoolExecutor(
+            max_workers=n_workers, mp_context=get_context("spawn")
+        ) as executor:
+            futures = {}
+            for algorithm in algorithms:
+                options = dict(train_options, n_cores=worker_cores)
+                for key in ("params", "search_params"):
+                    options[key] = select_algorithm_params(options.get(key), algorithm)
+                search_options = dict(options.get("search_options") or {})
+                if search_options.get("search_study"):
+                    search_options["search_study"] += f"-{algorithm}"
+                options["search_options"] = search_options
+                futures[algorithm] = executor.submit(
+                    train_algorithm,
+                    algorithm,
+                    frames_dir,
+                    run_ids[algorithm],
+                    options,
+                    model_format,
+                    code_paths,
+                )
+
+            for algorithm, future in futures.items():
+                try:
+                    metrics = future.result()
+                except Exception:
+                    print(f"train {algorithm} failed\n{traceback.format_exc()}")
+                    client.set_terminated(run_ids[algorithm], status="FAILED")
+                    continue
+                print(f"{algorithm}: {metrics}")
+                results[algorithm] = (run_ids[algorithm], metrics)
+
+    if not results:
+        raise Exception(f"all algorithms of {algorithms} failed")
+
+    return results, select_best_algorithm(results, key_metrics)
@@ -14,3 +14,32 @@
 # KIND, either express or implied.  See the License for the
 # specific language governing permissions and limitations
 # under the License.
+
+ALGORITHMS = ("lr", "svm", "lightgbm", "xgboost", "lr_sgd", "svm_sgd")
+
+
+def get_training_func(algorithm):
+    if algorithm == "svm":
+        from core.training.svm import train_svc as training_func
+
+    elif algorithm == "lightgbm":
+        from core.training.lightgbm import train_lightgbm as training_func
+
+    elif algorithm == "xgboost":
+        from core.training.xgboost import train_xgboost as training_func
+
+    elif algorithm == "lr":
+        from core.training.lr import train_lr as training_func
+
+    elif algorithm == "lr_sgd":
+        from core.training.sgd import train_lr_sgd as training_func
+
+    elif algorithm == "svm_sgd":
+        from core.training.sgd import train_svm_sgd as training_func
+
+    else:
+        raise ValueError(
+            f"algorithm {algorithm} not supported, must be one of {ALGORITHMS}"
+        )
+
+    return training_func
@@ -16,23 +16,56 @@
 # under the License.
 
 import mlflow
-from lightgbm import LGBMClassifier
+from lightgbm import LGBMClassifier, early_stopping
 from sklearn.pipeline import Pipeline
 
-from core.metrics import eval_classification_metrics
-from core.utils import get_oridinal_encoder, train_model
+from core.dtypes import encoded_dtype
+from core.encoders import get_cardinality_steps
+from core.metrics import eval_classification_metrics, log_learning_curve
+from core.profiling import stage
+from core.utils import (
+    check_categorical_mode,
+    fit_encoder,
+    get_categorical_encoder,
+    get_oridinal_encoder,
+    split_validation,
+    train_model,
+)
 
 from .params import LightGBMParams
 
 
 def train_lightgbm(
-    train_x, train_y, test_x, test_y, param_file=None, params=None, search_params=None
+    train_x,
+    train_y,
+    test_x,
+    test_y,
+    param_file=None,
+    params=None,
+    search_params=None,
+    search_options=None,
+    n_cores=None,
+    encoder_options=None,
+    init_pipeline=None,
+    cache_options=None,
 ):
-    pipeline_mods = []
-
-    pipeline_mods.append(("oridinal_encoder", get_oridinal_encoder()))
-    pipeline = Pipeline(steps=pipeline_mods)
-    train_x = pipeline.fit_transform(train_x)
+    encoder_options = encoder_options or {}
+    pipeline_mods = get_cardinality_steps(encoder_options)
+    categorical_mode = encoder_options.get("categorical_mode") or "ordinal"
+    if check_categorical_mode(categorical_mode) == "native":
+        # lightgbm splits category columns of a DataFrame natively
+        pipeline_mods.append(("categorical_encoder", get_categorical_encoder()))
+    else:
+        encoder = get_oridinal_encoder(dtype=encoded_dtype(train_x))
+        pipeline_mods.append(("oridinal_encoder", encoder))
+    pipeline, train_x, test_x, init_model = fit_encoder(
+        Pipeline(steps=pipeline_mods),
+        train_x,
+        test_x,
+        init_pipeline,
+        LGBMClassifier,
+        cache_options,
+    )
 
     params = LightGBMParams(
         LGBMClassifier,
@@ -41,11 +74,44 @@ def train_lightgbm(
         search_params=search_params,
     )
 
-    model = train_model(LGBMClassifier, params, train_x, train_y)
+    search_options = search_options or {}
+    options = params.pop_params(early_stopping_rounds=0, validation_fraction=0.1)
+    fit_params = {}
+    if options["early_stopping_rounds"] > 0:
+        train_x, valid_x, train_y, valid_y = split_validation(
+            train_x,
+            train_y,
+            options["validation_fraction"],
+            random_state=search_options.get("random_state", 1),
+        )
+        fit_params["eval_set"] = [(valid_x, valid_y)]
+        fit_params["callbacks"] = [
+            early_stopping(options["early_stopping_rounds"], verbose=False)
+        ]
+
+    if init_model is not None:
+        # continue boosting the trees of the fitted model
+        fit_params["init_model"] = init_model
+
+    with stage("fit"):
+        model = train_model(
+            LGBMClassifier,
+            params,
+            train_x,
+            train_y,
+            n_cores=n_cores,
+            fit_params=fit_params,
+            **search_options,
+        )
+
+    if "eval_set" in fit_params:
+        log_learning_curve(model.best_iteration_, model.evals_result_)
 
     pipeline.steps.append(("model", model))
 
-    y_pred = pipeline.predict(test_x)
+    with stage("predict"):
+        y_pred = model.predict(test_x)
 
-    metrics = eval_classification_metrics(test_y, y_pred)
+    with stage("eval"):
+        metrics = eval_classification_metrics(test_y, y_pred)
     return pipeline, metrics
@@ -15,24 +15,58 @@
 # specific language governing permissions and limitations
 # under the License.
 
+import warnings
+
 import mlflow
 from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
 
+from core.dtypes import encoded_dtype
+from core.encoders import get_cardinality_steps
 from core.metrics import eval_classification_metrics
-from core.utils import get_onehot_encoder, train_model
+from core.profiling import stage
+from core.utils import (
+    check_onehot_mode,
+    fit_encoder,
+    get_column_onehot_encoder,
+    get_onehot_encoder,
+    train_model,
+)
 
 from .params import LrParams
 
 
 def train_lr(
-    train_x, train_y, test_x, test_y, param_file=None, params=None, search_params=None
+    train_x,
+    train_y,
+    test_x,
+    test_y,
+    param_file=None,
+    params=None,
+    search_params=None,
+    search_options=None,
+    n_cores=None,
+    encoder_options=None,
+    init_pipeline=None,
+    cache_options=None,
 ):
-    pipeline_mods = []
-    pipeline_mods.append(("onehot_encoder", get_onehot_encoder()))
+    encoder_options = encoder_options or {}
+    pipeline_mods = get_cardinality_steps(encoder_options)
+    onehot_mode = encoder_options.get("onehot_mode") or "dense"
+    if check_onehot_mode(onehot_mode) == "sparse":
+        encoder = get_column_onehot_encoder(sparse=True, dtype=encoded_dtype(train_x))
+    else:
+        encoder = get_onehot_encoder(dtype=encoded_dtype(train_x))
+    pipeline_mods.append(("onehot_encoder", encoder))
 
-    pipeline = Pipeline(steps=pipeline_mods)
-    train_x = pipeline.fit_transform(train_x)
+    pipeline, train_x, test_x, init_model = fit_encoder(
+        Pipeline(steps=pipeline_mods),
+        train_x,
+        test_x,
+        init_pipeline,
+        LogisticRegression,
+        cache_options,
+    )
 
     params = LrParams(
         LogisticRegression,
@@ -41,11 +75,28 @@ def train_lr(
         search_params=search_params,
     )
 
-    model = train_model(LogisticRegression, params, train_x, train_y)
+    if init_model is not None:
+        if params.search_params:
+            warnings.warn("search fits from scratch, the fitted model is not reused")
+        # lbfgs, newton-cg, sag and saga continue from the fitted coefficients
+        params.input_params["warm_start"] = True
+
+    with stage("fit"):
+        model = train_model(
+            LogisticRegression,
+            params,
+            train_x,
+            train_y,
+            n_cores=n_cores,
+            init_model=init_model,
+            **(search_options or {}),
+        )
 
     pipeline.steps.append(("model", model))
 
-    y_pred = pipeline.predict(test_x)
+    with stage("predict"):
+        y_pred = model.predict(test_x)
 
-    metrics = eval_classification_metrics(test_y, y_pred)
+    with stage("eval"):
+        metrics = eval_classification_metrics(test_y, y_pred)
     return pipeline, metrics
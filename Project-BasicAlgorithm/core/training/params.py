@@ -68,6 +68,16 @@ class Params:
             search_params[key] = new_values
         return search_params
 
+    def pop_params(self, **defaults):
+        """
+        pop options of the trainer that are not parameters of the model
+        """
+        options = {}
+        for key, default in defaults.items():
+            value = self.input_params.pop(key, default)
+            options[key] = self.match_type(default, value)
+        return options
+
     @staticmethod
     def load_cls_default_params(cls):
         default_values = deepcopy(cls.__init__.__defaults__)
@@ -148,7 +158,6 @@ class XGBoostParams(Params):
         params = Params.load_cls_default_params(XGBModel)
 
         params["objective"] = "binary:logistic"
-        params["use_label_encoder"] = True
         return params
 
 
@@ -165,10 +174,74 @@ class LrParams(Params):
 
 
 class SVMParams(Params):
+    # parameters of every svm engine besides the exact SVC
+    LINEAR_PARAMS = ("C", "class_weight", "tol", "max_iter", "random_state")
+    ENGINE_PARAMS = {
+        "linear": LINEAR_PARAMS
+        + (
+            "penalty",
+            "loss",
+            "dual",
+            "multi_class",
+            "fit_intercept",
+            "intercept_scaling",
+        ),
+        "nystroem": LINEAR_PARAMS
+        + ("kernel", "gamma", "degree", "coef0", "n_components"),
+        "rff": LINEAR_PARAMS + ("gamma", "n_components"),
+    }
+
+    @staticmethod
+    def load_cls_default_params(cls):
+        from sklearn.svm import SVC, LinearSVC
+
+        params = {
+            key: parameter.default
+            for key, parameter in inspect.signature(LinearSVC).parameters.items()
+        }
+        params.update(deepcopy(inspect.getfullargspec(SVC).kwonlydefaults))
+        params["dual"] = True
+        params["n_components"] = 1000
+
+        return params
+
+    @staticmethod
+    def gamma(value):
+        # "scale" and "auto" stay strings, numbers of param strings are floats
+        if isinstance(value, str) and value not in ("scale", "auto"):
+            return float(value)
+        return value
+
+    def map_engine_params(self, engine):
+        """
+        drop the parameters the svm engine does not use
+        """
+        if engine == "exact":
+            from sklearn.svm import SVC
+
+            allowed = set(inspect.getfullargspec(SVC).kwonlydefaults)
+        else:
+            allowed = set(self.ENGINE_PARAMS[engine])
+
+        for params in (self.input_params, self.search_params):
+            for key in list(params):
+                if key not in allowed:
+                    warnings.warn(f"{key} is not used by svm engine {engine}")
+                    params.pop(key)
+
+        # SVC runs without iteration limit by default, the linear solvers can not
+        if engine != "exact" and self.input_params.get("max_iter") == -1:
+            self.input_params.pop("max_iter")
+
+
+class SGDParams(Params):
     @staticmethod
     def load_cls_default_params(cls):
-        from sklearn.svm import SVC
+        from sklearn.linear_model import SGDClassifier
 
-        params = deepcopy(inspect.getfullargspec(SVC).kwonlydefaults)
+        params = {
+            key: parameter.default
+            for key, parameter in inspect.signature(SGDClassifier).parameters.items()
+        }
 
         return params
@@ -0,0 +1,193 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import json
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn import __version__ as sklearn_version
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import confusion_matrix
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.utils.fixes import parse_version
+
+from core.data import get_usecols, iter_frames, split_xy
+from core.encoders import get_cardinality_steps, select_categorical_columns
+from core.metrics import eval_confusion_metrics
+from core.profiling import stage
+from core.resources import available_cores, set_model_threads
+
+from .params import SGDParams
+
+# scikit-learn 1.1 renamed the log loss
+LOG_LOSS = "log"
+if parse_version(sklearn_version) >= parse_version("1.1"):
+    LOG_LOSS = "log_loss"
+
+STREAM_CHUNK_ROWS = 100000
+SAMPLE_ROWS = 100000
+
+
+def load_categories(categories_file):
+    """
+    load json file of {column: [category, ...]}
+    """
+    categories_file = categories_file or ""
+    if not categories_file.strip():
+        return {}
+    with open(categories_file, "r") as r_f:
+        categories = json.load(r_f)
+    return categories
+
+
+def read_sample(data_path, columns=None, sample_rows=SAMPLE_ROWS):
+    frames = []
+    n_rows = 0
+    for frame in iter_frames(data_path, columns, chunk_rows=sample_rows):
+        frames.append(frame)
+        n_rows += len(frame)
+        if n_rows >= sample_rows:
+            break
+    return pd.concat(frames, ignore_index=True).iloc[:sample_rows]
+
+
+def scan_classes(data_path, label_column, chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    all labels of the data, partial_fit needs them in the first call
+    """
+    classes = set()
+    for frame in iter_frames(data_path, [label_column], chunk_rows):
+        classes.update(frame[label_column].dropna().unique())
+    return np.array(sorted(classes))
+
+
+def get_streaming_encoder(sample_x, categories=None):
+    """
+    sparse one-hot for categorical columns with known categories or the ones of
+    the sample, numeric columns are imputed and scaled by the sample
+    """
+    categories = categories or {}
+    known_columns = [column for column in categories if column in sample_x.columns]
+    sample_columns = [
+        column
+        for column in select_categorical_columns(sample_x)
+        if column not in categories
+    ]
+    numeric_columns = [
+        column
+        for column in sample_x.columns
+        if column not in known_columns and column not in sample_columns
+    ]
+
+    transformers = []
+    if known_columns:
+        encoder = OneHotEncoder(
+            categories=[categories[column] for column in known_columns],
+            handle_unknown="ignore",
+        )
+        transformers.append(("known_onehot", encoder, known_columns))
+    if sample_columns:
+        encoder = OneHotEncoder(handle_unknown="ignore")
+        transformers.append(("onehot", encoder, sample_columns))
+    if numeric_columns:
+        scaler = Pipeline([("imputer", SimpleImputer()), ("scaler", StandardScaler())])
+        transformers.append(("numeric", scaler, numeric_columns))
+    return ColumnTransformer(transformers, sparse_threshold=1.0)
+
+
+def train_sgd(
+    train_path,
+    test_path,
+    label_column,
+    loss,
+    columns=None,
+    categories_file=None,
+    param_file=None,
+    params=None,
+    search_params=None,
+    search_options=None,
+    n_cores=None,
+    encoder_options=None,
+):
+    """
+    train a linear model with partial_fit over the train data chunk by chunk for
+    n_epochs, the encoder is fitted on the first sample_rows rows and the
+    categories of categories_file, memory is bounded by chunk_rows
+    """
+    params = SGDParams(SGDClassifier, param_file=param_file, param_str=params)
+    options = params.pop_params(
+        n_epochs=5, chunk_rows=STREAM_CHUNK_ROWS, sample_rows=SAMPLE_ROWS
+    )
+    params.input_params.setdefault("loss", loss)
+    if search_params:
+        warnings.warn("search_params is not supported by streaming training")
+    random_state = (search_options or {}).get("random_state")
+    params.input_params.setdefault("random_state", random_state)
+    set_model_threads(SGDClassifier, params.input_params, n_cores or available_cores())
+
+    usecols = get_usecols(columns, label_column)
+    with stage("encode"):
+        sample_x, _ = split_xy(
+            read_sample(train_path, usecols, options["sample_rows"]), label_column
+        )
+        pipeline_mods = get_cardinality_steps(encoder_options)
+        encoder = get_streaming_encoder(sample_x, load_categories(categories_file))
+        pipeline_mods.append(("encoder", encoder))
+        pipeline = Pipeline(steps=pipeline_mods)
+        pipeline.fit(sample_x)
+        classes = scan_classes(train_path, label_column, options["chunk_rows"])
+
+    model = SGDClassifier(**params.input_params)
+    rng = np.random.RandomState(random_state)
+    with stage("fit"):
+        for epoch in range(options["n_epochs"]):
+            n_rows = 0
+            for frame in iter_frames(train_path, usecols, options["chunk_rows"]):
+                frame = frame.dropna(subset=[label_column])
+                # shuffle rows inside the chunk for the stochastic updates
+                frame = frame.iloc[rng.permutation(len(frame))]
+                x, y = split_xy(frame, label_column)
+                model.partial_fit(
+                    pipeline.transform(x), y[label_column].to_numpy(), classes=classes
+                )
+                n_rows += len(frame)
+            print(f"epoch {epoch + 1}/{options['n_epochs']} fitted {n_rows} rows")
+
+    pipeline.steps.append(("model", model))
+
+    with stage("eval"):
+        confusion = np.zeros((len(classes), len(classes)), dtype=np.int64)
+        for frame in iter_frames(test_path, usecols, options["chunk_rows"]):
+            frame = frame.dropna(subset=[label_column])
+            x, y = split_xy(frame, label_column)
+            confusion += confusion_matrix(
+                y[label_column].to_numpy(), pipeline.predict(x), labels=classes
+            )
+        metrics = eval_confusion_metrics(confusion)
+    return pipeline, metrics
+
+
+def train_lr_sgd(train_path, test_path, label_column, **kwargs):
+    return train_sgd(train_path, test_path, label_column, loss=LOG_LOSS, **kwargs)
+
+
+def train_svm_sgd(train_path, test_path, label_column, **kwargs):
+    return train_sgd(train_path, test_path, label_column, loss="hinge", **kwargs)
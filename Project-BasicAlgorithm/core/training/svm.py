@@ -16,33 +16,195 @@
 # under the License.
 
 import mlflow
+import numpy as np
+from scipy import sparse
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.kernel_approximation import Nystroem, RBFSampler
 from sklearn.pipeline import Pipeline
-from sklearn.svm import SVC
+from sklearn.svm import SVC, LinearSVC
 
+from core.dtypes import encoded_dtype
+from core.encoders import get_cardinality_steps
 from core.metrics import eval_classification_metrics
-from core.utils import get_onehot_encoder, train_model
+from core.profiling import stage
+from core.utils import (
+    check_onehot_mode,
+    fit_encoder,
+    get_column_onehot_encoder,
+    get_onehot_encoder,
+    train_model,
+)
 
 from .params import SVMParams
 
+SVM_ENGINES = ("auto", "exact", "linear", "nystroem", "rff")
+# the exact SVC scales quadratically in rows, auto engine leaves it above this
+SVM_AUTO_ROWS = 100000
+
+
+def resolve_gamma(gamma, X):
+    """
+    numeric gamma of SVC "scale" and "auto" for the kernel feature maps
+    """
+    if gamma == "auto":
+        return 1.0 / X.shape[1]
+    if gamma == "scale":
+        if sparse.issparse(X):
+            variance = X.multiply(X).mean() - X.mean() ** 2
+        else:
+            variance = np.asarray(X, dtype=np.float64).var()
+        return 1.0 / (X.shape[1] * variance) if variance > 0 else 1.0
+    return gamma
+
+
+class KernelApproximationSVC(BaseEstimator, ClassifierMixin):
+    """
+    kernel SVM approximated by a Nystroem or random Fourier (rff) feature map
+    followed by LinearSVC, linear in rows instead of quadratic
+    """
+
+    def __init__(
+        self,
+        feature_map="nystroem",
+        kernel="rbf",
+        gamma="scale",
+        degree=3,
+        coef0=0.0,
+        n_components=1000,
+        C=1.0,
+        class_weight=None,
+        tol=1e-4,
+        max_iter=1000,
+        random_state=None,
+    ):
+        self.feature_map = feature_map
+        self.kernel = kernel
+        self.gamma = gamma
+        self.degree = degree
+        self.coef0 = coef0
+        self.n_components = n_components
+        self.C = C
+        self.class_weight = class_weight
+        self.tol = tol
+        self.max_iter = max_iter
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        gamma = resolve_gamma(self.gamma, X)
+        n_components = min(self.n_components, X.shape[0])
+        if self.feature_map == "rff":
+            feature_map = RBFSampler(
+                gamma=gamma, n_components=n_components, random_state=self.random_state
+            )
+        else:
+            feature_map = Nystroem(
+                kernel=self.kernel,
+                gamma=gamma,
+                degree=self.degree,
+                coef0=self.coef0,
+                n_components=n_components,
+                random_state=self.random_state,
+            )
+        self.feature_map_ = feature_map.fit(X)
+        self.svm_ = LinearSVC(
+            C=self.C,
+            class_weight=self.class_weight,
+            tol=self.tol,
+            max_iter=self.max_iter,
+            random_state=self.random_state,
+            # rows are never less than components, the primal is faster
+            dual=False,
+        )
+        self.svm_.fit(self.feature_map_.transform(X), y)
+        self.classes_ = self.svm_.classes_
+        return self
+
+    def decision_function(self, X):
+        return self.svm_.decision_function(self.feature_map_.transform(X))
+
+    def predict(self, X):
+        return self.svm_.predict(self.feature_map_.transform(X))
+
+
+def choose_svm_engine(svm_engine, n_rows, kernel="rbf", auto_rows=SVM_AUTO_ROWS):
+    if svm_engine not in SVM_ENGINES:
+        raise ValueError(
+            f"svm_engine {svm_engine} not supported, must be one of {SVM_ENGINES}"
+        )
+    if svm_engine != "auto":
+        return svm_engine
+    if n_rows <= auto_rows:
+        return "exact"
+    return "linear" if kernel == "linear" else "nystroem"
+
+
+def get_svm_cls(engine):
+    if engine == "exact":
+        return SVC
+    if engine == "linear":
+        return LinearSVC
+    return KernelApproximationSVC
+
 
 def train_svc(
-    train_x, train_y, test_x, test_y, param_file=None, params=None, search_params=None
+    train_x,
+    train_y,
+    test_x,
+    test_y,
+    param_file=None,
+    params=None,
+    search_params=None,
+    search_options=None,
+    n_cores=None,
+    encoder_options=None,
+    cache_options=None,
 ):
-    pipeline_mods = []
-    pipeline_mods.append(("onehot_encoder", get_onehot_encoder()))
+    encoder_options = encoder_options or {}
+    pipeline_mods = get_cardinality_steps(encoder_options)
+    onehot_mode = encoder_options.get("onehot_mode") or "dense"
+    if check_onehot_mode(onehot_mode) == "sparse":
+        encoder = get_column_onehot_encoder(sparse=True, dtype=encoded_dtype(train_x))
+    else:
+        encoder = get_onehot_encoder(dtype=encoded_dtype(train_x))
+    pipeline_mods.append(("onehot_encoder", encoder))
 
-    pipeline = Pipeline(steps=pipeline_mods)
-    train_x = pipeline.fit_transform(train_x)
+    pipeline, train_x, test_x, _ = fit_encoder(
+        Pipeline(steps=pipeline_mods), train_x, test_x, cache_options=cache_options
+    )
 
     params = SVMParams(
         SVC, param_file=param_file, param_str=params, search_params=search_params
     )
+    options = params.pop_params(svm_engine="auto", svm_auto_rows=SVM_AUTO_ROWS)
+    engine = choose_svm_engine(
+        options["svm_engine"],
+        train_x.shape[0],
+        kernel=params.input_params.get("kernel", "rbf"),
+        auto_rows=options["svm_auto_rows"],
+    )
+    print(f"svm engine: {engine}")
+    if mlflow.active_run() is not None:
+        mlflow.log_param("svm_engine", engine)
+    params.map_engine_params(engine)
+    if engine in ("nystroem", "rff"):
+        params.input_params["feature_map"] = engine
+    model_cls = get_svm_cls(engine)
 
-    model = train_model(SVC, params, train_x, train_y)
+    with stage("fit"):
+        model = train_model(
+            model_cls,
+            params,
+            train_x,
+            train_y,
+            n_cores=n_cores,
+            **(search_options or {}),
+        )
 
     pipeline.steps.append(("model", model))
 
-    y_pred = pipeline.predict(test_x)
+    with stage("predict"):
+        y_pred = model.predict(test_x)
 
-    metrics = eval_classification_metrics(test_y, y_pred)
+    with stage("eval"):
+        metrics = eval_classification_metrics(test_y, y_pred)
     return pipeline, metrics
@@ -16,37 +16,136 @@
 # under the License.
 
 import mlflow
-from sklearn.model_selection import GridSearchCV
 from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder
 from xgboost import XGBClassifier
 
-from core.metrics import eval_classification_metrics
-from core.utils import get_oridinal_encoder, train_model
+from core.dtypes import encoded_dtype
+from core.encoders import get_cardinality_steps
+from core.metrics import eval_classification_metrics, log_learning_curve
+from core.profiling import stage
+from core.utils import (
+    check_categorical_mode,
+    fit_encoder,
+    get_categorical_encoder,
+    get_oridinal_encoder,
+    split_validation,
+    train_model,
+)
 
 from .params import XGBoostParams
 
 
+class XGBLabelClassifier(XGBClassifier):
+    """
+    XGBClassifier for labels of any type,
+    xgboost 1.6 removed the label encoder and only accepts labels 0..n-1
+    """
+
+    def fit(self, X, y, **kwargs):
+        init_model = kwargs.get("xgb_model")
+        if isinstance(init_model, XGBLabelClassifier):
+            # labels keep the encoding of the trees to continue
+            self.label_encoder_ = init_model.label_encoder_
+            best_iteration = getattr(init_model, "best_iteration", None)
+            if best_iteration is not None:
+                # continue from the rounds early stopping kept, not the rest
+                kwargs["xgb_model"] = init_model.get_booster()[: best_iteration + 1]
+        else:
+            self.label_encoder_ = LabelEncoder().fit(y)
+        if kwargs.get("eval_set"):
+            kwargs["eval_set"] = [
+                (eval_x, self.label_encoder_.transform(eval_y))
+                for eval_x, eval_y in kwargs["eval_set"]
+            ]
+        super().fit(X, self.label_encoder_.transform(y), **kwargs)
+        self.classes_ = self.label_encoder_.classes_
+        return self
+
+    def predict(self, X, **kwargs):
+        y_pred = super().predict(X, **kwargs)
+        return self.label_encoder_.inverse_transform(y_pred.astype(int))
+
+
 def train_xgboost(
-    train_x, train_y, test_x, test_y, param_file=None, params=None, search_params=None
+    train_x,
+    train_y,
+    test_x,
+    test_y,
+    param_file=None,
+    params=None,
+    search_params=None,
+    search_options=None,
+    n_cores=None,
+    encoder_options=None,
+    init_pipeline=None,
+    cache_options=None,
 ):
-    pipeline_mods = []
-    pipeline_mods.append(("oridinal_encoder", get_oridinal_encoder()))
-    pipeline = Pipeline(steps=pipeline_mods)
-
-    train_x = pipeline.fit_transform(train_x)
+    encoder_options = encoder_options or {}
+    pipeline_mods = get_cardinality_steps(encoder_options)
+    categorical_mode = encoder_options.get("categorical_mode") or "ordinal"
+    native_categorical = check_categorical_mode(categorical_mode) == "native"
+    if native_categorical:
+        pipeline_mods.append(("categorical_encoder", get_categorical_encoder()))
+    else:
+        encoder = get_oridinal_encoder(dtype=encoded_dtype(train_x))
+        pipeline_mods.append(("oridinal_encoder", encoder))
+    pipeline, train_x, test_x, init_model = fit_encoder(
+        Pipeline(steps=pipeline_mods),
+        train_x,
+        test_x,
+        init_pipeline,
+        XGBLabelClassifier,
+        cache_options,
+    )
 
     params = XGBoostParams(
-        XGBClassifier,
+        XGBLabelClassifier,
         param_file=param_file,
         param_str=params,
-        use_label_encoder=True,
         search_params=search_params,
     )
+    if native_categorical:
+        # categorical splits of a DataFrame need the hist tree method
+        params.input_params["enable_categorical"] = True
+        params.input_params.setdefault("tree_method", "hist")
+
+    search_options = search_options or {}
+    options = params.pop_params(early_stopping_rounds=0, validation_fraction=0.1)
+    fit_params = {}
+    if options["early_stopping_rounds"] > 0:
+        train_x, valid_x, train_y, valid_y = split_validation(
+            train_x,
+            train_y,
+            options["validation_fraction"],
+            random_state=search_options.get("random_state", 1),
+        )
+        fit_params["eval_set"] = [(valid_x, valid_y)]
+        fit_params["verbose"] = False
+        params.input_params["early_stopping_rounds"] = options["early_stopping_rounds"]
+
+    if init_model is not None:
+        # continue boosting the trees of the fitted model
+        fit_params["xgb_model"] = init_model
+
+    with stage("fit"):
+        model = train_model(
+            XGBLabelClassifier,
+            params,
+            train_x,
+            train_y,
+            n_cores=n_cores,
+            fit_params=fit_params,
+            **search_options,
+        )
 
-    model = train_model(XGBClassifier, params, train_x, train_y)
+    if "eval_set" in fit_params:
+        log_learning_curve(model.best_iteration, model.evals_result())
 
     pipeline.steps.append(("model", model))
-    y_pred = pipeline.predict(test_x)
+    with stage("predict"):
+        y_pred = model.predict(test_x)
 
-    metrics = eval_classification_metrics(test_y, y_pred)
+    with stage("eval"):
+        metrics = eval_classification_metrics(test_y, y_pred)
     return pipeline, metrics
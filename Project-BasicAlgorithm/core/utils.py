@@ -17,33 +17,216 @@
 
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import GridSearchCV
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.compose import ColumnTransformer
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
 
+from core.encoders import select_categorical_columns
+from core.features import encode_with_cache
+from core.profiling import profiler, stage
+from core.resources import (
+    available_cores,
+    count_search_fits,
+    limit_blas_threads,
+    log_thread_plan,
+    plan_threads,
+    set_model_threads,
+)
+from core.search import get_search_cv, print_search_results
 
-def get_onehot_encoder(sparse=False, handle_unknown="ignore"):
-    return OneHotEncoder(sparse=sparse, handle_unknown=handle_unknown)
+CATEGORICAL_MODES = ("ordinal", "native")
+ONEHOT_MODES = ("dense", "sparse")
 
 
-def get_oridinal_encoder(unknown_value=np.nan, handle_unknown="use_encoded_value"):
-    return OrdinalEncoder(unknown_value=unknown_value, handle_unknown=handle_unknown)
+def check_categorical_mode(categorical_mode):
+    if categorical_mode not in CATEGORICAL_MODES:
+        raise ValueError(
+            f"categorical_mode {categorical_mode} not supported, "
+            f"must be one of {CATEGORICAL_MODES}"
+        )
+    return categorical_mode
 
 
-def train_model(model_cls, params, train_x, train_y):
+def check_onehot_mode(onehot_mode):
+    if onehot_mode not in ONEHOT_MODES:
+        raise ValueError(
+            f"onehot_mode {onehot_mode} not supported, must be one of {ONEHOT_MODES}"
+        )
+    return onehot_mode
+
+
+def get_onehot_encoder(sparse=False, handle_unknown="ignore", dtype=np.float64):
+    return OneHotEncoder(sparse=sparse, handle_unknown=handle_unknown, dtype=dtype)
+
+
+def get_column_onehot_encoder(sparse=True, dtype=np.float64):
+    """
+    one-hot encode categorical columns only, numeric columns pass through
+    unexpanded, the output is a CSR matrix with sparse
+    """
+    return ColumnTransformer(
+        [
+            (
+                "onehot",
+                get_onehot_encoder(sparse=sparse, dtype=dtype),
+                select_categorical_columns,
+            )
+        ],
+        remainder="passthrough",
+        sparse_threshold=1.0 if sparse else 0.0,
+    )
+
+
+def get_oridinal_encoder(
+    unknown_value=np.nan, handle_unknown="use_encoded_value", dtype=np.float64
+):
+    return OrdinalEncoder(
+        unknown_value=unknown_value, handle_unknown=handle_unknown, dtype=dtype
+    )
+
+
+class CategoricalDtypeEncoder(BaseEstimator, TransformerMixin):
+    """
+    keep the DataFrame and convert text and category columns to category dtype
+    with the categories seen in fit, values unseen in fit become missing,
+    for models with native categorical support
+    """
+
+    def __init__(self, columns=None):
+        self.columns = columns
+
+    def fit(self, X, y=None):
+        columns = self.columns
+        if columns is None:
+            columns = select_categorical_columns(X)
+        self.categories_ = {}
+        for column in columns:
+            series = X[column]
+            if series.dtype.name != "category":
+                series = series.astype("category")
+            self.categories_[column] = series.cat.categories
+        return self
+
+    def transform(self, X):
+        X = X.copy(deep=False)
+        for column, categories in self.categories_.items():
+            X[column] = pd.Categorical(X[column], categories=categories)
+        return X
+
+
+def get_categorical_encoder(columns=None):
+    return CategoricalDtypeEncoder(columns=columns)
+
+
+def fit_encoder(
+    pipeline,
+    train_x,
+    test_x,
+    init_pipeline=None,
+    model_cls=None,
+    cache_options=None,
+):
+    """
+    fit the encoder pipeline and encode train_x and test_x, the encoded features
+    are cached by core.features with cache_options, or reuse the fitted encoder
+    of init_pipeline to continue training its model.
+    Return the encoder pipeline, the encoded data and the model of init_pipeline
+    """
+    if init_pipeline is None:
+        with stage("encode"):
+            if cache_options:
+                pipeline, train_x, test_x = encode_with_cache(
+                    pipeline, train_x, test_x, cache_options
+                )
+            else:
+                train_x = pipeline.fit_transform(train_x)
+                test_x = pipeline.transform(test_x)
+        return pipeline, train_x, test_x, None
+
+    init_model = init_pipeline.steps[-1][1]
+    if model_cls is not None and not isinstance(init_model, model_cls):
+        raise ValueError(
+            f"can not continue training {type(init_model).__name__} "
+            f"as {model_cls.__name__}"
+        )
+    pipeline = Pipeline(steps=list(init_pipeline.steps[:-1]))
+    with stage("encode"):
+        train_x = pipeline.transform(train_x)
+        test_x = pipeline.transform(test_x)
+    return pipeline, train_x, test_x, init_model
+
+
+def split_validation(train_x, train_y, validation_fraction=0.1, random_state=1):
+    """
+    carve a validation set out of the train set for early stopping,
+    seeded like load_data so that the same data trains the same model
+    """
+    try:
+        return train_test_split(
+            train_x,
+            train_y,
+            test_size=validation_fraction,
+            random_state=random_state,
+            stratify=train_y,
+        )
+    except ValueError:
+        # a label with a single row can not be stratified
+        return train_test_split(
+            train_x, train_y, test_size=validation_fraction, random_state=random_state
+        )
+
+
+def train_model(
+    model_cls,
+    params,
+    train_x,
+    train_y,
+    n_cores=None,
+    fit_params=None,
+    init_model=None,
+    **search_options,
+):
     """
-    train model directly, or train model with searching params
+    train model directly, or train model with searching params,
+    search_options are passed to core.search.get_search_cv,
+    n_cores (all available cores by default) are split between parallel
+    search fits and the threads of every model,
+    fit_params such as eval_set are passed to every fit,
+    a warm_start model without search continues from the coefficients of the
+    fitted init_model
     """
+    fit_params = fit_params or {}
+    n_fits = count_search_fits(
+        params.search_params,
+        search_options.get("search_strategy", "grid"),
+        search_options.get("search_budget"),
+    )
+    plan = plan_threads(n_cores or available_cores(), n_fits)
+    log_thread_plan(plan)
+    set_model_threads(model_cls, params.input_params, plan["model_threads"])
 
     model = model_cls(**params.input_params)
+    if init_model is not None and not params.search_params:
+        # the fitted attributes a warm_start fit initializes from
+        model.coef_ = init_model.coef_.copy()
+        model.intercept_ = init_model.intercept_.copy()
 
-    if params.search_params:
-        optimized_model = GridSearchCV(estimator=model, param_grid=params.search_params)
-        optimized_model.fit(train_x, train_y)
-        model = optimized_model.best_estimator_
-        params = optimized_model.cv_results_['params']
-        mean_test_score = optimized_model.cv_results_['mean_test_score']
-        for param, score in zip(params, mean_test_score):
-            print(param, score)
-    else:
-        model.fit(train_x, train_y)
+    with limit_blas_threads(plan["model_threads"]):
+        if params.search_params:
+            optimized_model = get_search_cv(
+                model,
+                params.search_params,
+                n_jobs=plan["search_jobs"],
+                **search_options,
+            )
+            with stage("search"):
+                optimized_model.fit(train_x, train_y, **fit_params)
+            # the best estimator is refit on the whole train set inside fit
+            profiler.record("refit", optimized_model.refit_time_)
+            model = optimized_model.best_estimator_
+            print_search_results(optimized_model)
+        else:
+            model.fit(train_x, train_y, **fit_params)
     return model
@@ -0,0 +1,71 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+
+from core.cache import DirectoryCache, file_fingerprint, make_cache_key
+
+
+def write(path, content):
+    with open(path, "w") as w_f:
+        w_f.write(content)
+    return path
+
+
+def test_make_cache_key_is_stable():
+    key = make_cache_key("data", label_column="label", columns=["a", "b"])
+    assert key == make_cache_key("data", columns=["a", "b"], label_column="label")
+    assert key != make_cache_key("data", label_column="target", columns=["a", "b"])
+    assert key != make_cache_key("other", label_column="label", columns=["a", "b"])
+
+
+def test_file_fingerprint_changes_with_content(tmp_path):
+    path = write(tmp_path / "data.csv", "a,label\n1,0\n")
+    fingerprint = file_fingerprint(str(path))
+    assert fingerprint == file_fingerprint(str(path))
+
+    write(path, "a,label\n2,1\n")
+    # same size, the mtime may not change within the clock resolution
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert file_fingerprint(str(path)) != fingerprint
+
+
+def test_file_fingerprint_of_directory_and_glob(tmp_path):
+    write(tmp_path / "part-0.csv", "a\n1\n")
+    write(tmp_path / "part-1.csv", "a\n2\n")
+    fingerprint = file_fingerprint(str(tmp_path))
+    glob_fingerprint = file_fingerprint(str(tmp_path / "part-*.csv"))
+    assert glob_fingerprint == file_fingerprint(str(tmp_path / "part-*.csv"))
+
+    write(tmp_path / "part-2.csv", "a\n3\n")
+    assert file_fingerprint(str(tmp_path)) != fingerprint
+    assert file_fingerprint(str(tmp_path / "part-*.csv")) != glob_fingerprint
+
+
+def test_directory_cache_put_get_and_evict(tmp_path):
+    cache = DirectoryCache(str(tmp_path), max_mb=1.5 / 1024, namespace="data")
+    assert cache.get("a") is None
+
+    path = cache.put("a", lambda path: write(os.path.join(path, "f"), "x" * 1024))
+    assert cache.get("a") == path
+    assert os.path.exists(os.path.join(path, "f"))
+
+    # the new entry is kept, the least recently used one is evicted
+    cache.put("b", lambda path: write(os.path.join(path, "f"), "x" * 1024))
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
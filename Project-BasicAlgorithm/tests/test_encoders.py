@@ -0,0 +1,67 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
+
+from core.encoders import RARE_CATEGORY, get_cardinality_steps
+
+
+def make_frame(n_rows=1000):
+    rng = np.random.RandomState(0)
+    return pd.DataFrame(
+        {
+            "user": [f"user_{i}" for i in rng.randint(0, 500, n_rows)],
+            "city": rng.choice(["a", "b", "c", "d"], n_rows, p=[0.5, 0.3, 0.19, 0.01]),
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "encoder",
+    [
+        OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1),
+        OneHotEncoder(handle_unknown="ignore"),
+    ],
+)
+def test_hash_buckets_grouped_by_frequency(encoder):
+    X = make_frame()
+    encoder_options = dict(hash_threshold=100, hash_buckets=64, min_frequency=0.02)
+    steps = get_cardinality_steps(encoder_options)
+    assert [name for name, _ in steps] == ["hashing_encoder", "rare_category_grouper"]
+
+    pipeline = Pipeline(steps + [("encoder", encoder)])
+    encoded = pipeline.fit_transform(X)
+    assert encoded.shape[0] == len(X)
+
+    grouped = Pipeline(steps).transform(X)
+    assert grouped["user"].map(type).eq(str).all()
+    assert RARE_CATEGORY in set(grouped["city"])
+    assert grouped["user"].nunique() <= 64
+
+
+def test_hash_buckets_keep_missing_values():
+    X = make_frame(200)
+    X.loc[:9, "user"] = None
+    steps = get_cardinality_steps(dict(hash_columns=["user"], hash_buckets=8))
+    hashed = Pipeline(steps).fit_transform(X)
+    assert hashed["user"].isna().sum() == 10
+    assert set(hashed["user"].dropna()) <= {f"bucket_{i}" for i in range(8)}
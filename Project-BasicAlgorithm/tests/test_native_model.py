@@ -0,0 +1,97 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import mlflow.pyfunc
+import numpy as np
+import pandas as pd
+import pytest
+from lightgbm import LGBMClassifier
+from sklearn.pipeline import Pipeline
+
+from core.native_model import resolve_model_format, save_native_model
+from core.training.xgboost import XGBLabelClassifier
+from core.utils import get_categorical_encoder, get_oridinal_encoder
+
+
+@pytest.fixture(autouse=True)
+def tracking_uri(tmp_path, monkeypatch):
+    # saving a pyfunc model must not create ./mlruns
+    monkeypatch.setenv("MLFLOW_TRACKING_URI", f"file:{tmp_path / 'mlruns'}")
+
+
+def make_data(n_rows=600, n_labels=2, random_state=0):
+    rng = np.random.RandomState(random_state)
+    x = pd.DataFrame(
+        {
+            "a": rng.rand(n_rows),
+            "b": rng.rand(n_rows),
+            "c": rng.choice(["x", "y", "z"], n_rows),
+        }
+    )
+    score = x["a"] + (x["c"] == "x") + rng.rand(n_rows) * 0.5
+    bins = np.quantile(score, np.linspace(0, 1, n_labels + 1)[1:-1])
+    y = pd.Series(np.array(["low", "mid", "high"])[np.digitize(score, bins)])
+    return x, y
+
+
+def assert_round_trip(pipeline, x, path):
+    save_native_model(pipeline, str(path))
+    model = mlflow.pyfunc.load_model(str(path))
+    assert np.array_equal(np.asarray(model.predict(x)), pipeline.predict(x))
+
+
+@pytest.mark.parametrize("n_labels", [2, 3])
+def test_lightgbm_round_trip(tmp_path, n_labels):
+    x, y = make_data(n_labels=n_labels)
+    pipeline = Pipeline(
+        [
+            ("oridinal_encoder", get_oridinal_encoder()),
+            ("model", LGBMClassifier(n_estimators=20, verbose=-1)),
+        ]
+    )
+    pipeline.fit(x, y)
+    assert_round_trip(pipeline, x, tmp_path / "model")
+
+
+@pytest.mark.parametrize("n_labels", [2, 3])
+def test_xgboost_round_trip_with_early_stopping(tmp_path, n_labels):
+    x, y = make_data(n_labels=n_labels)
+    encoder = get_categorical_encoder().fit(x)
+    encoded = encoder.transform(x)
+    model = XGBLabelClassifier(
+        n_estimators=200,
+        early_stopping_rounds=5,
+        enable_categorical=True,
+        tree_method="hist",
+    )
+    model.fit(
+        encoded[:500], y[:500], eval_set=[(encoded[500:], y[500:])], verbose=False
+    )
+    # predictions use the best iteration, not every boosted round
+    assert model.best_iteration + 1 < model.get_booster().num_boosted_rounds()
+
+    pipeline = Pipeline([("categorical_encoder", encoder), ("model", model)])
+    assert_round_trip(pipeline, x, tmp_path / "model")
+
+
+def test_resolve_model_format():
+    assert resolve_model_format("lightgbm", "native") == "native"
+    assert resolve_model_format("lr", "native") == "pickle"
+    assert resolve_model_format("xgboost") == "pickle"
+    with pytest.raises(ValueError):
+        resolve_model_format("xgboost", "onnx")
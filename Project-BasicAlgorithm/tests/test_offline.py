@@ -0,0 +1,85 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import mlflow
+import pytest
+from mlflow.tracking import MlflowClient
+from mlflow.utils.mlflow_tags import MLFLOW_PARENT_RUN_ID
+
+from core.offline import SYNCED_RUN_TAG, offline_tracking, sync_runs
+
+
+@pytest.fixture
+def remote_uri(tmp_path, monkeypatch):
+    uri = f"file:{tmp_path / 'remote'}"
+    monkeypatch.setenv("MLFLOW_TRACKING_URI", uri)
+    for key in ("MLFLOW_RUN_ID", "MLFLOW_EXPERIMENT_ID"):
+        monkeypatch.delenv(key, raising=False)
+    mlflow.set_tracking_uri(uri)
+    yield uri
+    mlflow.set_tracking_uri(None)
+
+
+def log_offline_runs(offline_dir, tmp_path):
+    artifact = tmp_path / "model.txt"
+    artifact.write_text("model")
+    with offline_tracking(offline_dir):
+        with mlflow.start_run() as parent:
+            mlflow.log_param("algorithm", "all")
+            for step, value in enumerate([0.5, 0.7, 0.9]):
+                mlflow.log_metric("f1-score", value, step=step)
+            mlflow.log_artifact(str(artifact), "model")
+            with mlflow.start_run(nested=True) as child:
+                mlflow.log_param("algorithm", "lr")
+    return parent.info.run_id, child.info.run_id
+
+
+def test_sync_runs_between_file_stores(tmp_path, remote_uri):
+    offline_dir = str(tmp_path / "offline")
+    parent_id, child_id = log_offline_runs(offline_dir, tmp_path)
+    remote = MlflowClient(remote_uri)
+    # nothing reaches the tracking server before the sync
+    assert remote.search_runs(["0"]) == []
+
+    synced = sync_runs(offline_dir)
+    assert set(synced) == {parent_id, child_id}
+
+    parent = remote.get_run(synced[parent_id])
+    assert parent.info.status == "FINISHED"
+    assert parent.data.params == {"algorithm": "all"}
+    history = remote.get_metric_history(synced[parent_id], "f1-score")
+    assert [metric.value for metric in history] == [0.5, 0.7, 0.9]
+    assert [item.path for item in remote.list_artifacts(synced[parent_id])] == [
+        "model"
+    ]
+
+    child = remote.get_run(synced[child_id])
+    assert child.data.tags[MLFLOW_PARENT_RUN_ID] == synced[parent_id]
+
+    local = MlflowClient(f"file:{offline_dir}")
+    assert local.get_run(parent_id).data.tags[SYNCED_RUN_TAG] == synced[parent_id]
+
+
+def test_sync_runs_is_idempotent(tmp_path, remote_uri):
+    offline_dir = str(tmp_path / "offline")
+    parent_id, _ = log_offline_runs(offline_dir, tmp_path)
+
+    synced = sync_runs(offline_dir, run_ids=[parent_id])
+    assert sync_runs(offline_dir, run_ids=[parent_id]) == synced
+    remote = MlflowClient(remote_uri)
+    assert len(remote.search_runs(["0"])) == 2
@@ -0,0 +1,167 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import time
+from types import SimpleNamespace
+
+import pytest
+from mlflow.tracking import MlflowClient
+
+from core.registry import (
+    get_version_metrics,
+    metric_tag,
+    prune_model_versions,
+    search_run_metrics,
+    select_pruned_versions,
+)
+
+DAY_MS = 24 * 3600 * 1000
+
+
+def make_versions(stages, age_days=None):
+    """
+    versions 1..n with stages, version n is the newest
+    """
+    now = time.time() * 1000
+    age_days = age_days or [0] * len(stages)
+    return [
+        SimpleNamespace(
+            version=str(i + 1),
+            current_stage=stage,
+            creation_timestamp=now - age * DAY_MS,
+        )
+        for i, (stage, age) in enumerate(zip(stages, age_days))
+    ]
+
+
+def pruned_names(pruned):
+    return sorted(int(version.version) for version in pruned)
+
+
+def test_nothing_pruned_without_rules():
+    versions = make_versions(["Archived"] * 5)
+    assert select_pruned_versions(versions) == []
+
+
+def test_keep_last_never_prunes_production_or_staging():
+    versions = make_versions(
+        ["Archived", "Production", "Staging", "None", "Archived", "Archived"]
+    )
+    pruned = select_pruned_versions(versions, keep_last=2)
+    assert pruned_names(pruned) == [1, 4]
+
+
+def test_keep_top_by_metrics():
+    versions = make_versions(["Archived"] * 5)
+    metrics = {"1": 0.9, "2": 0.5, "3": 0.7, "4": 0.6, "5": 0.1}
+    pruned = select_pruned_versions(versions, metrics, keep_last=1, keep_top=2)
+    assert pruned_names(pruned) == [2, 4]
+
+
+def test_max_age_days():
+    versions = make_versions(["Archived"] * 4, age_days=[30, 10, 2, 0])
+    pruned = select_pruned_versions(versions, max_age_days=7)
+    assert pruned_names(pruned) == [1, 2]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("MLFLOW_TRACKING_URI", f"file:{tmp_path / 'mlruns'}")
+    return MlflowClient()
+
+
+def create_run(client, experiment_id, f1_score=None):
+    run_id = client.create_run(experiment_id).info.run_id
+    if f1_score is not None:
+        client.log_metric(run_id, "f1-score", f1_score)
+    client.set_terminated(run_id)
+    return run_id
+
+
+def test_search_run_metrics_in_experiments_of_runs(client):
+    first, second, other = (
+        client.create_experiment(name) for name in ("first", "second", "other")
+    )
+    create_run(client, other, 0.1)
+    run_ids = [
+        create_run(client, first, 0.5),
+        create_run(client, first, 0.6),
+        create_run(client, first),
+        create_run(client, second, 0.7),
+    ]
+
+    searched = []
+    search_runs = client.search_runs
+
+    def record_search_runs(experiment_ids, **kwargs):
+        searched.extend(experiment_ids)
+        return search_runs(experiment_ids, **kwargs)
+
+    client.search_runs = record_search_runs
+    run_metrics = search_run_metrics(client, run_ids + ["unknown"], "f1-score")
+    assert run_metrics == {
+        run_ids[0]: 0.5,
+        run_ids[1]: 0.6,
+        run_ids[3]: 0.7,
+    }
+    assert other not in searched
+
+
+def test_version_metrics_cached_with_their_run(client):
+    experiment_id = client.create_experiment("registry")
+    client.create_registered_model("model")
+    for f1_score in (0.5, 0.9, 0.7):
+        run_id = create_run(client, experiment_id, f1_score)
+        client.create_model_version("model", f"runs:/{run_id}/model", run_id)
+    versions = client.search_model_versions("name='model'")
+    run_ids = {str(version.version): version.run_id for version in versions}
+
+    # a metric cached for another version registered with the same number
+    client.set_registered_model_tag("model", metric_tag("f1-score", "2"), "old:0.1")
+    model_tags = client.get_registered_model("model").tags
+    metrics = get_version_metrics(client, "model", versions, "f1-score", model_tags)
+    assert {str(version): metric for version, metric in metrics.items()} == {
+        "1": 0.5,
+        "2": 0.9,
+        "3": 0.7,
+    }
+    tags = client.get_registered_model("model").tags
+    assert tags[metric_tag("f1-score", "2")] == f"{run_ids['2']}:0.9"
+
+    # cached metrics are not searched again
+    model_tags = client.get_registered_model("model").tags
+    client.get_run = client.search_runs = None
+    assert (
+        get_version_metrics(client, "model", versions, "f1-score", model_tags)
+        == metrics
+    )
+
+
+def test_prune_drops_cached_metrics(client):
+    experiment_id = client.create_experiment("registry")
+    client.create_registered_model("model")
+    for f1_score in (0.5, 0.9, 0.7):
+        run_id = create_run(client, experiment_id, f1_score)
+        client.create_model_version("model", f"runs:/{run_id}/model", run_id)
+
+    pruned = prune_model_versions("model", keep_top=1, key_metrics="f1-score")
+    assert pruned_names(pruned) == [1, 3]
+    tags = client.get_registered_model("model").tags
+    assert [key for key in tags if key.startswith("version_metrics.")] == [
+        metric_tag("f1-score", "2")
+    ]
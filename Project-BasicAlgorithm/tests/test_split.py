@@ -0,0 +1,87 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.split import assign_test_rows, hash_split_data, hash_uniform
+
+
+def test_hash_uniform_is_reproducible_and_seeded():
+    values = np.arange(10000)
+    uniform = hash_uniform(values, random_state=1)
+    assert np.array_equal(uniform, hash_uniform(values, random_state=1))
+    assert not np.array_equal(uniform, hash_uniform(values, random_state=2))
+    assert ((uniform >= 0) & (uniform < 1)).all()
+    # roughly uniform
+    assert abs((uniform < 0.25).mean() - 0.25) < 0.02
+
+
+def test_assign_test_rows_stratified_across_chunks():
+    rng = np.random.RandomState(0)
+    labels = np.array([0] * 900 + [1] * 100)
+    rng.shuffle(labels)
+    uniform = hash_uniform(np.arange(len(labels)))
+
+    label_counts = {}
+    chunks = [slice(i, i + 300) for i in range(0, len(labels), 300)]
+    is_test = np.concatenate(
+        [
+            assign_test_rows(uniform[chunk], labels[chunk], 0.2, label_counts)
+            for chunk in chunks
+        ]
+    )
+    # every label keeps its share of test rows
+    assert is_test[labels == 0].sum() == 180
+    assert is_test[labels == 1].sum() == 20
+    assert label_counts == {0: (900, 180), 1: (100, 20)}
+
+
+def write_data(path, n_rows=1000):
+    data = pd.DataFrame(
+        {
+            "id": np.arange(n_rows),
+            "x": np.random.RandomState(0).rand(n_rows),
+            "label": np.arange(n_rows) % 4 == 0,
+        }
+    )
+    data.to_csv(path, index=False)
+    return data
+
+
+def test_hash_split_data_without_cache(tmp_path):
+    data_path = str(tmp_path / "data.csv")
+    data = write_data(data_path)
+    output_dir = tmp_path / "split"
+    output_dir.mkdir()
+
+    options = dict(test_size=0.25, split_key="id", stratify=True)
+    train_path, test_path = hash_split_data(
+        data_path, "csv", "label", output_dir=str(output_dir), **options
+    )
+    assert os.path.dirname(train_path) == str(output_dir)
+    train, test = pd.read_csv(train_path), pd.read_csv(test_path)
+    assert len(train) + len(test) == len(data)
+    assert set(train["id"]).isdisjoint(test["id"])
+    assert test["label"].sum() == data["label"].sum() // 4
+
+    with pytest.raises(ValueError):
+        hash_split_data(data_path, "csv", "label", **options)
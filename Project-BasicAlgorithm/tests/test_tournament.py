@@ -0,0 +1,109 @@
+# Licensed to Apache Software Foundation (ASF) under one or more contributor
+# license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright
+# ownership. Apache Software Foundation (ASF) licenses this file to you under
+# the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import mlflow
+import numpy as np
+import pandas as pd
+import pytest
+from mlflow.tracking import MlflowClient
+
+from core.tournament import (
+    ALL_ALGORITHMS,
+    parse_algorithms,
+    run_tournament,
+    select_algorithm_params,
+    select_best_algorithm,
+)
+
+
+@pytest.fixture(autouse=True)
+def tracking_uri(tmp_path, monkeypatch):
+    uri = f"file:{tmp_path / 'mlruns'}"
+    monkeypatch.setenv("MLFLOW_TRACKING_URI", uri)
+    mlflow.set_tracking_uri(uri)
+    yield
+    mlflow.set_tracking_uri(None)
+
+
+def test_parse_algorithms():
+    assert parse_algorithms("all") == list(ALL_ALGORITHMS)
+    assert parse_algorithms(" lr, lightgbm ,") == ["lr", "lightgbm"]
+    assert parse_algorithms("xgboost") == ["xgboost"]
+    for algorithm in ("", " , ", "lr,knn"):
+        with pytest.raises(ValueError, match="not supported"):
+            parse_algorithms(algorithm)
+
+
+def test_select_algorithm_params():
+    param_str = "max_iter=200;lr.C=0.5;lightgbm.num_leaves=15;svm.C=2"
+    assert select_algorithm_params(param_str, "lr") == "max_iter=200;C=0.5"
+    assert (
+        select_algorithm_params(param_str, "lightgbm") == "max_iter=200;num_leaves=15"
+    )
+    assert select_algorithm_params(param_str, "xgboost") == "max_iter=200"
+    # the value of a shared param may contain a dot
+    assert select_algorithm_params("C=0.5", "svm") == "C=0.5"
+    assert select_algorithm_params("", "lr") == ""
+    assert select_algorithm_params(None, "lr") is None
+
+
+def test_select_best_algorithm():
+    results = {
+        "lr": ("run_lr", {"f1-score": 0.7, "accuracy": 0.9}),
+        "svm": ("run_svm", {"f1-score": 0.8, "accuracy": 0.8}),
+    }
+    assert select_best_algorithm(results) == "svm"
+    assert select_best_algorithm(results, key_metrics="accuracy") == "lr"
+
+
+def make_frames(n_rows=300):
+    rng = np.random.RandomState(0)
+    x = pd.DataFrame({"a": rng.rand(n_rows), "b": rng.rand(n_rows)})
+    y = (x["a"] + rng.rand(n_rows) * 0.3 > 0.6).astype(int).to_frame("label")
+    split = n_rows * 4 // 5
+    return x[:split], y[:split], x[split:], y[split:]
+
+
+def test_run_tournament_skips_failed_algorithms():
+    with mlflow.start_run() as parent_run:
+        results, best_algorithm = run_tournament(
+            ["lr", "lightgbm"],
+            make_frames(),
+            # only the lightgbm child gets the invalid num_leaves
+            dict(params="max_iter=200;lightgbm.num_leaves=-1"),
+            n_cores=2,
+        )
+    assert list(results) == ["lr"]
+    assert best_algorithm == "lr"
+
+    client = MlflowClient()
+    runs = client.search_runs(
+        [parent_run.info.experiment_id],
+        f"tags.mlflow.parentRunId = '{parent_run.info.run_id}'",
+    )
+    status = {run.data.tags["mlflow.runName"]: run.info.status for run in runs}
+    assert status == {"lr": "FINISHED", "lightgbm": "FAILED"}
+    assert client.get_run(results["lr"][0]).data.params["algorithm"] == "lr"
+
+
+def test_run_tournament_validates_names_before_training():
+    with mlflow.start_run() as parent_run:
+        with pytest.raises(ValueError, match="can not be trained in a tournament"):
+            run_tournament(["lr", "lr_sgd"], make_frames(), {}, n_cores=2)
+    runs = MlflowClient().search_runs([parent_run.info.experiment_id])
+    assert [run.info.run_id for run in runs] == [parent_run.info.run_id]
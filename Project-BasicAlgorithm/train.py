@@ -16,12 +16,32 @@
 # under the License.
 
 import logging
+import os
+import tempfile
+from contextlib import nullcontext
 
 import click
 import mlflow
 import mlflow.sklearn
 
-from core.data import load_data
+from core.cache import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CACHE_MAX_MB,
+    file_fingerprint,
+    make_cache_key,
+)
+from core.data import get_data_key, load_data, load_split_paths, parse_columns
+from core.encoders import DEFAULT_HASH_BUCKETS
+from core.files import list_shards
+from core.native_model import ARTIFACT_PATHS, get_save_func, resolve_model_format
+from core.offline import offline_tracking, sync_runs
+from core.profiling import profiler, stage
+from core.registry import create_model_version, prune_model_versions
+from core.resources import available_cores
+from core.tournament import parse_algorithms, run_tournament
+from core.training import get_training_func
+from core.upload import DEFAULT_UPLOAD_TIMEOUT, ArtifactUpload
+from core.utils import check_categorical_mode, check_onehot_mode
 
 logging.basicConfig(
     level=logging.INFO,
@@ -31,67 +51,77 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# the logged pipeline may hold transformers of core
+CODE_PATHS = [os.path.join(os.path.dirname(os.path.abspath(__file__)), "core")]
 
-def get_training_func(algorithm):
-    if algorithm == "svm":
-        from core.training.svm import train_svc as training_func
+# algorithms trained chunk by chunk from the train and test files
+STREAMING_ALGORITHMS = ("lr_sgd", "svm_sgd")
 
-    elif algorithm == "lightgbm":
-        from core.training.lightgbm import train_lightgbm as training_func
+# algorithms that continue training from the Production model with --warm_start
+WARM_START_ALGORITHMS = ("lr", "lightgbm", "xgboost")
 
-    elif algorithm == "xgboost":
-        from core.training.xgboost import train_xgboost as training_func
 
-    elif algorithm == "lr":
-        from core.training.lr import train_lr as training_func
+def get_study_name(algorithm, data_key, param_file=None, *options):
+    """
+    the same task on the same data split, params and encoding resumes the
+    same study, data_key is the key of the split data, see get_data_key
+    """
+    key = make_cache_key(
+        data_key, algorithm, param_file and file_fingerprint(param_file), *options
+    )
+    return f"{algorithm}-{key[:16]}"
 
-    else:
-        assert f"{algorithm} not supported"
 
-    return training_func
+def register_model(
+    model_name,
+    run_id,
+    artifact_path,
+    upload=None,
+    upload_timeout=DEFAULT_UPLOAD_TIMEOUT,
+    keep_last=0,
+    keep_top=0,
+    max_age_days=0,
+    dry_run=False,
+):
+    """
+    register the model of run_id, then prune the versions of model_name by
+    the retention policy if there is one, see core.registry
+    """
+    with stage("register"):
+        create_model_version(
+            model_name,
+            key_metrics='f1-score',
+            run_id=run_id,
+            artifact_path=artifact_path,
+            upload=upload,
+            upload_timeout=upload_timeout,
+        )
+    if keep_last or keep_top or max_age_days:
+        with stage("prune"):
+            prune_model_versions(
+                model_name,
+                keep_last=keep_last,
+                keep_top=keep_top,
+                max_age_days=max_age_days,
+                key_metrics='f1-score',
+                dry_run=dry_run,
+            )
 
 
-def create_model_version(model_name, key_metrics=None, run_id=None, auto_replace=True):
+def load_production_model(model_name):
+    """
+    the Production version of model_name and its pipeline, None without one,
+    the pipeline is None as well if the version is not a pickled pipeline
+    """
     client = mlflow.tracking.MlflowClient()
-    filter_string = "name='{}'".format(model_name)
-    versions = client.search_model_versions(filter_string)
-
-    if not versions:
-        client.create_registered_model(model_name)
-
+    versions = client.search_model_versions("name='{}'".format(model_name))
     for version in versions:
         if version.current_stage == "Production":
-            client.transition_model_version_stage(
-                model_name, version=version.version, stage="Archived"
-            )
-
-    if run_id:
-        uri = f"runs:/{run_id}/sklearn_model"
-        mv = mlflow.register_model(uri, model_name)
-
-        if not key_metrics:
-            client.transition_model_version_stage(
-                model_name, version=mv.version, stage="Production"
-            )
-            logger.info("register last version to Production")
-
-    if key_metrics:
-        version2metrics = []
-        versions = client.search_model_versions(filter_string)
-        for version in versions:
-            metrics = client.get_run(version.run_id).data.metrics[key_metrics]
-            version2metrics.append((version.version, metrics))
-
-        logger.info(f"version2metrics({key_metrics}): {version2metrics}")
-
-        best_version = max(version2metrics, key=lambda x: x[1])[0]
-
-        logger.info("register version: %s to Production", best_version)
-        client.transition_model_version_stage(
-            model_name, version=best_version, stage="Production"
-        )
-
-    return versions
+            uri = f"models:/{model_name}/{version.version}"
+            if "sklearn" not in mlflow.models.get_model_info(uri).flavors:
+                return version, None
+            return version, mlflow.sklearn.load_model(uri)
+    return None, None
 
 
 @click.command()
@@ -103,29 +133,293 @@ def create_model_version(model_name, key_metrics=None, run_id=None, auto_replace
 @click.option("--param_file", default=None)
 @click.option("--params", default=None)
 @click.option("--search_params", default=None)
-def main(algorithm, data_path, label_column, model_name, random_state, param_file, params, search_params):
+@click.option("--search_strategy", default="grid")
+@click.option("--search_budget", default=0)
+@click.option("--search_resource", default="n_samples")
+@click.option("--search_storage", default=None)
+@click.option("--n_cores", default=0)
+@click.option("--categorical_mode", default="ordinal")
+@click.option("--onehot_mode", default="dense")
+@click.option("--min_frequency", type=float, default=0)
+@click.option("--max_categories", default=0)
+@click.option("--hash_columns", default=None)
+@click.option("--hash_threshold", default=0)
+@click.option("--hash_buckets", default=DEFAULT_HASH_BUCKETS)
+@click.option("--categories_file", default=None)
+@click.option("--use_cache", type=bool, default=True)
+@click.option("--cache_dir", default=None)
+@click.option("--cache_max_mb", type=float, default=DEFAULT_CACHE_MAX_MB)
+@click.option("--columns", default=None)
+@click.option("--dtype_mode", default="default")
+@click.option("--schema_file", default=None)
+@click.option("--split_mode", default="memory")
+@click.option("--split_key", default=None)
+@click.option("--stratify", type=bool, default=False)
+@click.option("--shard_workers", default=0)
+@click.option("--profile_memory", type=bool, default=False)
+@click.option("--warm_start", type=bool, default=False)
+@click.option("--keep_versions", default=0)
+@click.option("--keep_top_versions", default=0)
+@click.option("--keep_days", type=float, default=0)
+@click.option("--prune_dry_run", type=bool, default=False)
+@click.option("--upload_timeout", type=float, default=DEFAULT_UPLOAD_TIMEOUT)
+@click.option("--offline_dir", default=None)
+@click.option("--model_format", default="pickle")
+def main(
+    algorithm,
+    data_path,
+    label_column,
+    model_name,
+    random_state,
+    param_file,
+    params,
+    search_params,
+    search_strategy,
+    search_budget,
+    search_resource,
+    search_storage,
+    n_cores,
+    categorical_mode,
+    onehot_mode,
+    min_frequency,
+    max_categories,
+    hash_columns,
+    hash_threshold,
+    hash_buckets,
+    categories_file,
+    use_cache,
+    cache_dir,
+    cache_max_mb,
+    columns,
+    dtype_mode,
+    schema_file,
+    split_mode,
+    split_key,
+    stratify,
+    shard_workers,
+    profile_memory,
+    warm_start,
+    keep_versions,
+    keep_top_versions,
+    keep_days,
+    prune_dry_run,
+    upload_timeout,
+    offline_dir,
+    model_format,
+):
 
-    train_x, train_y, test_x, test_y = load_data(
-        data_path, label_column, random_state=random_state
+    profiler.sample_memory = profile_memory
+    algorithms = parse_algorithms(algorithm)
+    if len(algorithms) > 1 and set(algorithms) & set(STREAMING_ALGORITHMS):
+        raise ValueError(f"{STREAMING_ALGORITHMS} can not be trained with others")
+    # fail on an unknown mode before the data is loaded
+    check_categorical_mode(categorical_mode)
+    check_onehot_mode(onehot_mode)
+    if warm_start and (not model_name or algorithm not in WARM_START_ALGORITHMS):
+        raise ValueError(
+            f"warm_start needs model_name and one of {WARM_START_ALGORITHMS}"
+        )
+
+    data_options = dict(
+        random_state=random_state,
+        columns=parse_columns(columns),
+        dtype_mode=dtype_mode,
+        schema_file=schema_file or None,
+        split_mode=split_mode,
+        split_key=split_key or None,
+        stratify=stratify,
     )
-    training_func = get_training_func(algorithm)
-
-    with mlflow.start_run() as run:
-        model, metrics = training_func(train_x,
-                                       train_y,
-                                       test_x,
-                                       test_y,
-                                       param_file=param_file,
-                                       params=params,
-                                       search_params=search_params,
-                                       )
-        print(metrics)
-        mlflow.log_metrics(metrics)
-        mlflow.sklearn.log_model(model, artifact_path="sklearn_model")
-
-    if model_name:
-        create_model_version(
-            model_name, key_metrics='f1-score', run_id=run.info.run_id)
+    data_key = None
+    if use_cache or search_strategy == "bayes":
+        # key of the cached features and of the resumed search study
+        data_key = get_data_key(data_path, label_column, **data_options)
+    split_dir = None
+    if algorithm in STREAMING_ALGORITHMS:
+        if not use_cache:
+            # an uncached hash split is removed once the model is trained
+            split_dir = tempfile.TemporaryDirectory(prefix="hash-split-")
+        with stage("load"):
+            train_path, test_path = load_split_paths(
+                data_path,
+                label_column,
+                random_state=random_state,
+                use_cache=use_cache,
+                cache_dir=cache_dir or None,
+                cache_max_mb=cache_max_mb,
+                split_key=split_key or None,
+                stratify=stratify,
+                columns=parse_columns(columns),
+                output_dir=split_dir and split_dir.name,
+            )
+        data = dict(
+            train_path=train_path,
+            test_path=test_path,
+            label_column=label_column,
+            columns=parse_columns(columns),
+            categories_file=categories_file or None,
+        )
+    else:
+        with stage("load"):
+            train_x, train_y, test_x, test_y = load_data(
+                data_path,
+                label_column,
+                use_cache=use_cache,
+                cache_dir=cache_dir or None,
+                cache_max_mb=cache_max_mb,
+                shard_workers=shard_workers,
+                **data_options,
+            )
+        data = dict(train_x=train_x, train_y=train_y, test_x=test_x, test_y=test_y)
+        if use_cache:
+            # encoded features are cached by the data and the encoder params
+            data["cache_options"] = dict(
+                data_key=data_key,
+                cache_dir=cache_dir or None,
+                cache_max_mb=cache_max_mb,
+            )
+    search_options = dict(
+        search_strategy=search_strategy,
+        search_budget=search_budget or None,
+        search_resource=search_resource,
+        random_state=random_state,
+    )
+    encoder_options = dict(
+        categorical_mode=categorical_mode,
+        onehot_mode=onehot_mode,
+        min_frequency=min_frequency,
+        max_categories=max_categories,
+        hash_columns=parse_columns(hash_columns),
+        hash_threshold=hash_threshold,
+        hash_buckets=hash_buckets,
+    )
+    if search_strategy == "bayes":
+        search_options["search_storage"] = search_storage or os.path.join(
+            cache_dir or DEFAULT_CACHE_DIR, "search.db"
+        )
+        search_options["search_study"] = get_study_name(
+            algorithm,
+            data_key,
+            param_file,
+            params,
+            search_params,
+            encoder_options,
+        )
+
+    init_version = None
+    if warm_start:
+        with stage("load_model"):
+            init_version, init_pipeline = load_production_model(model_name)
+        if init_version is None:
+            logger.info("no Production version of %s, train from scratch", model_name)
+        elif init_pipeline is None:
+            logger.info(
+                "version %s is not a pickled pipeline, train from scratch",
+                init_version.version,
+            )
+            init_version = None
+        else:
+            logger.info("continue training version %s", init_version.version)
+            data["init_pipeline"] = init_pipeline
+
+    prune_options = dict(
+        keep_last=keep_versions,
+        keep_top=keep_top_versions,
+        max_age_days=keep_days,
+        dry_run=prune_dry_run,
+    )
+    # offline runs are logged to a local file store and synced after training
+    tracking = offline_tracking(offline_dir) if offline_dir else nullcontext({})
+    with tracking as sync_tags, mlflow.start_run() as run:
+        if sync_tags:
+            mlflow.set_tags(sync_tags)
+        if init_version is not None:
+            # lineage of the warm started model
+            mlflow.set_tags(
+                {
+                    "warm_start.model_name": model_name,
+                    "warm_start.model_version": init_version.version,
+                    "warm_start.run_id": init_version.run_id,
+                }
+            )
+        mlflow.log_param("data_shards", len(list_shards(data_path)))
+        if search_params:
+            mlflow.log_params(search_options)
+        mlflow.log_params(encoder_options)
+        if len(algorithms) > 1:
+            # every algorithm is a child run, the best one is registered
+            results, best_algorithm = run_tournament(
+                algorithms,
+                (train_x, train_y, test_x, test_y),
+                dict(
+                    param_file=param_file,
+                    params=params,
+                    search_params=search_params,
+                    search_options=search_options,
+                    encoder_options=encoder_options,
+                    cache_options=data.get("cache_options"),
+                ),
+                n_cores=n_cores or available_cores(),
+                model_format=model_format,
+                code_paths=CODE_PATHS,
+            )
+            best_run_id, metrics = results[best_algorithm]
+            artifact_path = ARTIFACT_PATHS[
+                resolve_model_format(best_algorithm, model_format)
+            ]
+            upload = None
+            print(f"best algorithm: {best_algorithm} {metrics}")
+            mlflow.log_param("best_algorithm", best_algorithm)
+            mlflow.log_metrics(metrics)
+        else:
+            training_func = get_training_func(algorithm)
+            model, metrics = training_func(**data,
+                                           param_file=param_file,
+                                           params=params,
+                                           search_params=search_params,
+                                           search_options=search_options,
+                                           n_cores=n_cores or None,
+                                           encoder_options=encoder_options,
+                                           )
+            # the model is saved and uploaded while metrics are logged and
+            # the registered versions compared
+            model_format = resolve_model_format(algorithm, model_format)
+            artifact_path = ARTIFACT_PATHS[model_format]
+            upload = ArtifactUpload(
+                run.info.run_id,
+                artifact_path,
+                get_save_func(model, model_format, code_paths=CODE_PATHS),
+            )
+            print(metrics)
+            mlflow.log_metrics(metrics)
+            best_run_id = run.info.run_id
+
+        # the run only ends once the model is uploaded, failed if it is not,
+        # offline runs are registered once synced
+        if model_name and not offline_dir:
+            register_model(
+                model_name,
+                best_run_id,
+                artifact_path,
+                upload=upload,
+                upload_timeout=upload_timeout,
+                **prune_options,
+            )
+        elif upload is not None:
+            with stage("upload_wait"):
+                upload.wait(upload_timeout)
+
+    if split_dir is not None:
+        split_dir.cleanup()
+
+    run_id = run.info.run_id
+    if offline_dir:
+        with stage("sync"):
+            synced = sync_runs(offline_dir, run_ids=[run_id])
+        run_id, best_run_id = synced[run_id], synced[best_run_id]
+        if model_name:
+            register_model(model_name, best_run_id, artifact_path, **prune_options)
+
+    profiler.log(run_id)
 
 
 if __name__ == "__main__":